@@ -6,6 +6,15 @@ from dataclasses import dataclass
 
 import boto3
 
+# Per-user operations report their outcome through log(); bulk runs switch this
+# off and print a summary instead
+verbose = True
+
+
+def log(message):
+    if verbose:
+        print(message)
+
 
 @dataclass(frozen=True)
 class CognitoGroup:
@@ -66,16 +75,16 @@ def add_to_group(client, profile, user, group_name):
             GroupName=group_name,
         )
         if response["ResponseMetadata"]["HTTPStatusCode"] == 200:
-            print(f"User {user.email} added to group {group_name}")
+            log(f"User {user.email} added to group {group_name}")
         return response
     except client.exceptions.UserNotFoundException as error:
-        print(f"User {user.email} does not exist")
+        log(f"User {user.email} does not exist")
         return error.response
     except client.exceptions.ResourceNotFoundException as error:
-        print(f"Group {group_name} does not exist")
+        log(f"Group {group_name} does not exist")
         return error.response
     except client.exceptions.ClientError as error:
-        print(f"Fail to add user {user.email} to group {group_name}")
+        log(f"Fail to add user {user.email} to group {group_name}")
         return error.response
 
 
@@ -105,15 +114,15 @@ def create_user(client, profile, user, resend=False):
             )
         if response["ResponseMetadata"]["HTTPStatusCode"] == 200:
             if resend:
-                print(f"Resend confirmation to user {user.email} successfully")
+                log(f"Resend confirmation to user {user.email} successfully")
             else:
-                print(f"User {user.email} was created successfully")
+                log(f"User {user.email} was created successfully")
         return response
     except client.exceptions.UsernameExistsException as error:
-        print(f"User {user.email} exists")
+        log(f"User {user.email} exists")
         return error.response
     except client.exceptions.ClientError as error:
-        print(f"Fail to create user {user.email}: {error.response}")
+        log(f"Fail to create user {user.email}: {error.response}")
         return error.response
 
 
@@ -124,13 +133,13 @@ def delete_user(client, profile, user):
             UserPoolId=profile["user_pool_id"], Username=user.email
         )
         if response["ResponseMetadata"]["HTTPStatusCode"] == 200:
-            print(f"User {user.email} was deleted successfully")
+            log(f"User {user.email} was deleted successfully")
         return response
     except client.exceptions.UserNotFoundException as error:
-        print(f"User {user.email} does not exist")
+        log(f"User {user.email} does not exist")
         return error.response
     except client.exceptions.ClientError as error:
-        print(f"Fail to delete user {user.email}")
+        log(f"Fail to delete user {user.email}")
         return error.response
 
 
@@ -141,13 +150,13 @@ def disable_user(client, profile, user):
             UserPoolId=profile["user_pool_id"], Username=user.email
         )
         if response["ResponseMetadata"]["HTTPStatusCode"] == 200:
-            print(f"User {user.email} was disabled successfully")
+            log(f"User {user.email} was disabled successfully")
         return response
     except client.exceptions.UserNotFoundException as error:
-        print(f"User {user.email} does not exist")
+        log(f"User {user.email} does not exist")
         return error.response
     except client.exceptions.ClientError as error:
-        print(f"Fail to disable user {user.email}")
+        log(f"Fail to disable user {user.email}")
         return error.response
 
 
@@ -158,17 +167,23 @@ def enable_user(client, profile, user):
             UserPoolId=profile["user_pool_id"], Username=user.email
         )
         if response["ResponseMetadata"]["HTTPStatusCode"] == 200:
-            print(f"User {user.email} was enabled successfully")
+            log(f"User {user.email} was enabled successfully")
         return response
     except client.exceptions.UserNotFoundException as error:
-        print(f"User {user.email} does not exist")
+        log(f"User {user.email} does not exist")
         return error.response
     except client.exceptions.ClientError as error:
-        print(f"Fail to disable user {user.email}")
+        log(f"Fail to disable user {user.email}")
         return error.response
 
 
 def init_client(profile):
+    """ The boto3 client of the profile's region, or the in-memory fake pool
+    for profiles with "backend: fake" (the keys under "fake" configure it) """
+    if profile.get("backend") == "fake":
+        import cognito_fake  # type: ignore # pylint: disable=import-outside-toplevel
+
+        return cognito_fake.FakeCognitoClient(**profile.get("fake", {}))
     client = boto3.client(
         "cognito-idp",
         aws_access_key_id=profile["access_key_id"],
@@ -178,28 +193,18 @@ def init_client(profile):
     return client
 
 
-def list_group_users(client, profile, group_name, token=""):
-    """ Lists all user from the specified group """
-    result = []
+def iter_group_users(client, profile, group_name, token=""):
+    """ Yields the users of the specified group as the pages arrive """
+    paginator = client.get_paginator("list_users_in_group")
+    pages = paginator.paginate(
+        UserPoolId=profile["user_pool_id"],
+        GroupName=group_name,
+        PaginationConfig={"StartingToken": token or None},
+    )
     try:
-        if token:
-            response = client.list_users_in_group(
-                UserPoolId=profile["user_pool_id"],
-                GroupName=group_name,
-                NextToken=token,
-            )
-        else:
-            response = client.list_users_in_group(
-                UserPoolId=profile["user_pool_id"], GroupName=group_name,
-            )
-        if response["ResponseMetadata"]["HTTPStatusCode"] == 200:
-            aws_users = response["Users"]
-            for aws_user in aws_users:
-                result.append(__convert_aws_user__(aws_user))
-            next_token = response.get("NextToken")
-            if next_token:
-                more = list_group_users(client, profile, group_name, next_token)
-                result.extend(more)
+        for page in pages:
+            for aws_user in page["Users"]:
+                yield __convert_aws_user__(aws_user)
     except client.exceptions.ResourceNotFoundException:
         print(f"Group {group_name} does not exist")
         sys.exit(2)
@@ -208,7 +213,10 @@ def list_group_users(client, profile, group_name, token=""):
         print("Fail to list groups")
         sys.exit(2)
 
-    return result
+
+def list_group_users(client, profile, group_name, token=""):
+    """ Lists all user from the specified group """
+    return list(iter_group_users(client, profile, group_name, token))
 
 
 def list_groups(client, profile):
@@ -232,31 +240,26 @@ def list_groups(client, profile):
     return result
 
 
-def list_users(client, profile, token=""):
-    """ Lists all users from the pool """
-    result = []
+def iter_users(client, profile, token=""):
+    """ Yields the users of the pool as the pages arrive """
+    paginator = client.get_paginator("list_users")
+    pages = paginator.paginate(
+        UserPoolId=profile["user_pool_id"],
+        PaginationConfig={"StartingToken": token or None},
+    )
     try:
-        if token:
-            response = client.list_users(
-                UserPoolId=profile["user_pool_id"], PaginationToken=token,
-            )
-        else:
-            response = client.list_users(UserPoolId=profile["user_pool_id"],)
-        if response["ResponseMetadata"]["HTTPStatusCode"] == 200:
-            aws_users = response["Users"]
-            for aws_user in aws_users:
-                result.append(__convert_aws_user__(aws_user))
-            next_token = response.get("PaginationToken")
-            if next_token:
-                more = list_users(client, profile, next_token)
-                result.extend(more)
-
+        for page in pages:
+            for aws_user in page["Users"]:
+                yield __convert_aws_user__(aws_user)
     except client.exceptions.ClientError as error:
         print("Fail to list users")
         print(error)
         sys.exit(2)
 
-    return result
+
+def list_users(client, profile, token=""):
+    """ Lists all users from the pool """
+    return list(iter_users(client, profile, token))
 
 
 def remove_from_group(client, profile, user, group_name):
@@ -268,16 +271,16 @@ def remove_from_group(client, profile, user, group_name):
             GroupName=group_name,
         )
         if response["ResponseMetadata"]["HTTPStatusCode"] == 200:
-            print(f"User {user.email} removed from the group {group_name}")
+            log(f"User {user.email} removed from the group {group_name}")
         return response
     except client.exceptions.UserNotFoundException as error:
-        print(f"User {user.email} does not exist")
+        log(f"User {user.email} does not exist")
         return error.response
     except client.exceptions.ResourceNotFoundException as error:
-        print(f"Group {group_name} does not exist")
+        log(f"Group {group_name} does not exist")
         return error.response
     except client.exceptions.ClientError as error:
-        print(f"Fail to remove user {user.email} from group {group_name}")
+        log(f"Fail to remove user {user.email} from group {group_name}")
         return error.response
 
 
@@ -288,10 +291,10 @@ def reset_user_password(client, profile, user):
         if response["ResponseMetadata"]["HTTPStatusCode"] == 200:
             # Resend confirmation
             response = create_user(client, profile, user, True)
-            print(f"Password of user {user.email} was reset successfully")
+            log(f"Password of user {user.email} was reset successfully")
         return response
     except client.exceptions.ClientError as error:
-        print(f"Fail to reset password of user {user.email}")
+        log(f"Fail to reset password of user {user.email}")
         return error.response
 
 
@@ -305,13 +308,13 @@ def set_user_password(client, profile, user, password="N0t-permanent!"):
             Permanent=False,
         )
         if response["ResponseMetadata"]["HTTPStatusCode"] == 200:
-            print(f"Password of user {user.email} was set successfully")
+            log(f"Password of user {user.email} was set successfully")
         return response
     except client.exceptions.UserNotFoundException as error:
-        print(f"User {user.email} does not exist")
+        log(f"User {user.email} does not exist")
         return error.response
     except client.exceptions.ClientError as error:
-        print(f"Fail to reset password of user {user.email}")
+        log(f"Fail to reset password of user {user.email}")
         return error.response
 
 
@@ -333,11 +336,11 @@ def update_user_attributes(client, profile, user, attr_name, attr_value):
             UserAttributes=[{"Name": attr_name, "Value": attr_value}],
         )
         if response["ResponseMetadata"]["HTTPStatusCode"] == 200:
-            print(f"User {user.email} was updated successfully")
+            log(f"User {user.email} was updated successfully")
         return response
     except client.exceptions.UserNotFoundException as error:
-        print(f"User {user.email} does not exist")
+        log(f"User {user.email} does not exist")
         return error.response
     except client.exceptions.ClientError as error:
-        print(f"Fail to disable user {user.email}")
+        log(f"Fail to disable user {user.email}")
         return error.response
@@ -0,0 +1,134 @@
+# pylint: disable=global-statement,redefined-outer-name
+""" Measure bulk provisioning throughput against the in-memory fake pool """
+import argparse
+import time
+from dataclasses import dataclass
+from typing import List
+
+import cognito_bulk  # type: ignore
+from cognito_fake import FakeCognitoClient  # type: ignore
+
+PROFILE = {"user_pool_id": "fake"}
+GROUP = "attendees"
+
+
+@dataclass(frozen=True)
+class User:
+    """ Class for AWS Cognito user """
+
+    email: str
+    name: str
+
+
+class TimedExecutor(cognito_bulk.BulkExecutor):
+    """ Records how long each user took, retries and backoff included """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies: List[float] = []
+
+    def run_user(self, user, steps):
+        start = time.perf_counter()
+        result = super().run_user(user, steps)
+        self.latencies.append(time.perf_counter() - start)
+        return result
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def operation_steps(operation):
+    if operation == "create":
+        return [cognito_bulk.create_step(), cognito_bulk.add_step(GROUP)]
+    if operation == "disable":
+        return [cognito_bulk.disable_step]
+    return cognito_bulk.password_steps()
+
+
+def run_benchmark(args, workers: int):
+    client = FakeCognitoClient(
+        latency=args.latency,
+        jitter=args.jitter,
+        throttle_rate=args.throttle_rate,
+        error_rate=args.error_rate,
+        quota_scale=args.quota_scale,
+        groups=[GROUP],
+        seed=0,
+    )
+    users = [
+        User(email=f"user{i}@example.com", name=f"User {i}") for i in range(args.users)
+    ]
+    if args.operation != "create":
+        for user in users:
+            client.users[user.email] = {
+                "attributes": {"email": user.email},
+                "enabled": True,
+                "status": "CONFIRMED",
+            }
+
+    executor = TimedExecutor(client, PROFILE, workers, args.rate_scale)
+    start = time.perf_counter()
+    results = executor.run(users, operation_steps(args.operation))
+    elapsed = time.perf_counter() - start
+
+    calls = sum(client.calls.values())
+    failed = sum(result.status != "ok" for result in results)
+    print(
+        f"{workers:>7} {len(users) / elapsed:>9.1f} {calls / elapsed:>9.1f} "
+        + " ".join(
+            f"{percentile(executor.latencies, q) * 1000:>8.1f}"
+            for q in (0.5, 0.95, 0.99)
+        )
+        + f" {client.errors['TooManyRequestsException']:>9} {failed:>6}"
+    )
+
+
+def parse_arguments():
+    """ Parse Arguments """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--operation",
+        choices=["create", "disable", "reset"],
+        default="create",
+        help="create + add to group, disable, or password reset + resend",
+    )
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="Median seconds per call"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.5, help="Sigma of the log-normal latency"
+    )
+    parser.add_argument(
+        "--throttle-rate",
+        type=float,
+        default=0.0,
+        help="Probability of throttling a call regardless of the quotas",
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Probability of a 5xx error"
+    )
+    parser.add_argument(
+        "--quota-scale",
+        type=float,
+        default=1.0,
+        help="Scale of the quotas the fake pool enforces (0: unlimited)",
+    )
+    parser.add_argument(
+        "--rate-scale",
+        type=float,
+        default=1.0,
+        help="Scale of the quotas the executor paces itself to",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    print(f"{args.operation} of {args.users} users")
+    print("workers   users/s   calls/s   p50 ms   p95 ms   p99 ms throttled failed")
+    for workers in args.workers:
+        run_benchmark(args, workers)
@@ -0,0 +1,359 @@
+# pylint: disable=global-statement,redefined-outer-name
+""" Run per-user AWS Cognito operations concurrently within the API quotas """
+import csv
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cognito  # type: ignore
+import cognito_metrics  # type: ignore
+import cognito_snapshot  # type: ignore
+
+# Default requests per second of the Cognito quota categories
+# https://docs.aws.amazon.com/cognito/latest/developerguide/limits.html
+CATEGORY_RATES = {
+    "UserCreation": 50,
+    "UserUpdate": 25,
+    "UserAccountRecovery": 30,
+    "UserRead": 120,
+    "UserList": 30,
+}
+
+# Quota category of the APIs called through cognito.py
+API_CATEGORIES = {
+    "admin_create_user": "UserCreation",
+    "admin_add_user_to_group": "UserUpdate",
+    "admin_remove_user_from_group": "UserUpdate",
+    "admin_disable_user": "UserUpdate",
+    "admin_enable_user": "UserUpdate",
+    "admin_delete_user": "UserUpdate",
+    "admin_update_user_attributes": "UserUpdate",
+    "admin_set_user_password": "UserUpdate",
+    "admin_reset_user_password": "UserAccountRecovery",
+    "admin_get_user": "UserRead",
+    "list_users": "UserList",
+    "list_users_in_group": "UserList",
+}
+
+THROTTLE_CODES = {"TooManyRequestsException", "ThrottlingException"}
+
+
+class TokenBucket:
+    """ Thread-safe token bucket whose rate backs off when requests get
+    throttled and recovers additively as they succeed again """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """ Takes a token if there is one, returning 0, or else returns the
+        seconds until the next token """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        wait = self.try_acquire()
+        while wait:
+            time.sleep(wait)
+            wait = self.try_acquire()
+
+    def throttled(self):
+        with self.lock:
+            self.rate = max(1.0, self.rate / 2)
+
+    def succeeded(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 50)
+
+
+@dataclass
+class Result:
+    """ Outcome of the operations run for one user """
+
+    email: str
+    status: str = "ok"
+    steps: List[str] = field(default_factory=list)
+    attempts: int = 0
+    error: str = ""
+
+
+@dataclass(frozen=True)
+class Step:
+    """ One API call of a per-user operation
+
+    run(client, profile, user) returns the response of the cognito.py function;
+    error codes listed in allowed don't stop the following steps.
+    """
+
+    name: str
+    api: str
+    run: Callable
+    allowed: Tuple[str, ...] = ()
+
+
+def error_code(response) -> str:
+    if response["ResponseMetadata"]["HTTPStatusCode"] == 200:
+        return ""
+    return response.get("Error", {}).get("Code", "Error")
+
+
+class BulkExecutor:
+    """ Runs steps for many users on a bounded thread pool, one token bucket
+    per quota category, retrying throttled calls with jittered backoff
+
+    With a deadline (a time.monotonic() value), throttled calls are not
+    retried past it and users not started by then fail with DeadlineExceeded.
+    """
+
+    def __init__(
+        self,
+        client,
+        profile,
+        workers: int = 8,
+        rate_scale: float = 1.0,
+        max_attempts: int = 8,
+        base_delay: float = 0.2,
+        deadline: Optional[float] = None,
+    ):
+        self.client = client
+        self.profile = profile
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.deadline = deadline
+        self.buckets = {
+            category: TokenBucket(rate * rate_scale)
+            for category, rate in CATEGORY_RATES.items()
+        }
+
+    def call(self, step: Step, user) -> Tuple[dict, int]:
+        bucket = self.buckets[API_CATEGORIES[step.api]]
+        for attempt in range(1, self.max_attempts + 1):
+            bucket.acquire()
+            response = step.run(self.client, self.profile, user)
+            if error_code(response) not in THROTTLE_CODES:
+                bucket.succeeded()
+                cognito_metrics.metrics.retried(step.api, attempt - 1)
+                return response, attempt
+            bucket.throttled()
+            delay = self.base_delay * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+            if self.deadline is not None and time.monotonic() + delay > self.deadline:
+                break
+            time.sleep(delay)
+        cognito_metrics.metrics.retried(step.api, attempt - 1)
+        return response, attempt
+
+    def run_user(self, user, steps: List[Step]) -> Result:
+        result = Result(email=user.email)
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            result.status = "DeadlineExceeded"
+            result.error = "Not started before the deadline"
+            return result
+        for step in steps:
+            try:
+                response, attempts = self.call(step, user)
+                code = error_code(response)
+                message = response.get("Error", {}).get("Message", "")
+            except Exception as error:  # pylint: disable=broad-except
+                attempts, code, message = 1, type(error).__name__, str(error)
+            result.attempts += attempts
+            result.steps.append(f"{step.name}:{code or 'ok'}")
+            if code and code not in step.allowed:
+                result.status, result.error = code, message
+                break
+        return result
+
+    def run(self, users, steps: List[Step]) -> List[Result]:
+        """ Runs the steps for every user, returning the results in input order """
+        return self.run_each((user, steps) for user in users)
+
+    def run_each(self, items, on_result=None) -> List[Result]:
+        """ Runs each (user, steps) pair, returning the results in input order
+
+        on_result(user, result) is called from the worker threads as each user
+        completes.
+        """
+
+        def run(item):
+            result = self.run_user(*item)
+            if on_result:
+                on_result(item[0], result)
+            return result
+
+        previous, cognito.verbose = cognito.verbose, False
+        try:
+            with ThreadPoolExecutor(self.workers) as pool:
+                futures = [pool.submit(run, item) for item in items]
+                try:
+                    return [future.result() for future in futures]
+                except KeyboardInterrupt:
+                    # Only let the users already being processed finish
+                    for future in futures:
+                        future.cancel()
+                    raise
+        finally:
+            cognito.verbose = previous
+
+
+def create_step() -> Step:
+    return Step(
+        "create",
+        "admin_create_user",
+        cognito.create_user,
+        allowed=("UsernameExistsException",),
+    )
+
+
+def add_step(group) -> Step:
+    return Step(
+        "add",
+        "admin_add_user_to_group",
+        lambda client, profile, user: cognito.add_to_group(
+            client, profile, user, group
+        ),
+    )
+
+
+def remove_step(group) -> Step:
+    return Step(
+        "remove",
+        "admin_remove_user_from_group",
+        lambda client, profile, user: cognito.remove_from_group(
+            client, profile, user, group
+        ),
+    )
+
+
+def attribute_step(name, value) -> Step:
+    return Step(
+        f"set {name}",
+        "admin_update_user_attributes",
+        lambda client, profile, user: cognito.update_user_attributes(
+            client, profile, user, name, value
+        ),
+    )
+
+
+def password_steps(password=None) -> List[Step]:
+    """ Sets the given temporary password, or resets the password the way
+    cognito.reset_user_password does: a default temporary password followed
+    by a resent invitation """
+    if password:
+        return [
+            Step(
+                "set password",
+                "admin_set_user_password",
+                lambda client, profile, user: cognito.set_user_password(
+                    client, profile, user, password
+                ),
+            )
+        ]
+    return [
+        Step("set password", "admin_set_user_password", cognito.set_user_password),
+        Step(
+            "resend",
+            "admin_create_user",
+            lambda client, profile, user: cognito.create_user(
+                client, profile, user, True
+            ),
+        ),
+    ]
+
+
+disable_step = Step("disable", "admin_disable_user", cognito.disable_user)
+enable_step = Step("enable", "admin_enable_user", cognito.enable_user)
+
+
+def user_steps(args) -> List[Step]:
+    """ Steps of the operation selected on the cognito_users.py/dry_run_users.py
+    command line """
+    if args.disable:
+        return [disable_step]
+    if args.enable:
+        return [enable_step]
+    if args.remove_from_group:
+        return [remove_step(args.remove_from_group)]
+    if args.verified:
+        return [attribute_step("email_verified", "true")]
+    if args.group:
+        return [create_step(), add_step(args.group)]
+    return [create_step()]
+
+
+def print_summary(results: List[Result], elapsed: float, show_errors=False):
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    rate = len(results) / elapsed if elapsed else 0.0
+    print(f"{len(results)} users in {elapsed:.1f}s ({rate:.1f} users/s)")
+    for status, count in sorted(counts.items()):
+        print(f"  {status}: {count}")
+    for result in results:
+        if result.status != "ok":
+            message = f": {result.error}" if show_errors and result.error else ""
+            print(f"  {result.email} {' '.join(result.steps)}{message}")
+
+
+def save_results(results: List[Result], file_path: str):
+    """ Writes one row per user, as JSON lines for .jsonl files or else CSV """
+    with open(file_path, "w", newline="") as results_file:
+        if file_path.endswith(".jsonl"):
+            for result in results:
+                results_file.write(json.dumps(asdict(result)) + "\n")
+        else:
+            writer = csv.DictWriter(
+                results_file, ["email", "status", "steps", "attempts", "error"]
+            )
+            writer.writeheader()
+            for result in results:
+                row = asdict(result)
+                row["steps"] = " ".join(result.steps)
+                writer.writerow(row)
+    print(f"Results are written to {file_path}")
+
+
+def add_arguments(parser):
+    """ Adds the bulk execution options to a script's argument parser """
+    parser.add_argument(
+        "--workers", type=int, default=8, help="Concurrent Cognito requests"
+    )
+    parser.add_argument(
+        "--rate-scale",
+        type=float,
+        default=1.0,
+        help="Fraction of the default Cognito quotas to use (e.g. 0.5 when "
+        "other tools share the pool)",
+    )
+    parser.add_argument(
+        "--results", help="CSV or .jsonl file to write per-user results to"
+    )
+    cognito_snapshot.add_path_argument(parser)
+
+
+def run_from_args(args, client, profile, users):
+    """ Runs the operation selected by args and reports the results """
+    executor = BulkExecutor(client, profile, args.workers, args.rate_scale)
+    start = time.monotonic()
+    results = executor.run(users, user_steps(args))
+    cognito_snapshot.invalidate(args.snapshot)
+    print_summary(results, time.monotonic() - start, args.debug)
+    if args.results:
+        save_results(results, args.results)
+    return results
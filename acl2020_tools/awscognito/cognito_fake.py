@@ -0,0 +1,270 @@
+# pylint: disable=global-statement,redefined-outer-name,invalid-name,unused-argument
+""" In-memory stand-in for the boto3 cognito-idp client
+
+FakeCognitoClient implements the part of the client the scripts use (the
+admin_* user operations, list_groups, create_group and the list_users /
+list_users_in_group paginators) with boto3's response and exception shapes.
+It adds configurable latency, throttling and error injection, and enforces
+the Cognito quotas unless quota_scale is 0, so bulk runs can be measured
+without a real pool. Select it with "backend: fake" in the AWS profile.
+"""
+import random
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+from cognito_bulk import API_CATEGORIES, CATEGORY_RATES, TokenBucket  # type: ignore
+
+ERROR_CODES = [
+    "UsernameExistsException",
+    "UserNotFoundException",
+    "ResourceNotFoundException",
+    "TooManyRequestsException",
+    "InternalErrorException",
+]
+
+exceptions = SimpleNamespace(
+    ClientError=ClientError,
+    **{code: type(code, (ClientError,), {}) for code in ERROR_CODES},
+)
+
+TOKEN_KEYS = {"list_users": "PaginationToken", "list_users_in_group": "NextToken"}
+
+
+def operation_name(api: str) -> str:
+    return "".join(part.title() for part in api.split("_"))
+
+
+def client_error(code: str, message: str, api: str) -> ClientError:
+    response = {
+        "Error": {"Code": code, "Message": message},
+        "ResponseMetadata": {"HTTPStatusCode": 400},
+    }
+    return getattr(exceptions, code)(response, operation_name(api))
+
+
+def ok(**fields):
+    return dict(ResponseMetadata={"HTTPStatusCode": 200}, **fields)
+
+
+class FakePaginator:
+    """ The boto3 paginator interface over a fake list call """
+
+    def __init__(self, client, api):
+        self.client = client
+        self.api = api
+
+    def paginate(self, PaginationConfig=None, **kwargs):
+        config = PaginationConfig or {}
+        token = config.get("StartingToken")
+        limit = config.get("PageSize") or 60
+        while True:
+            if token:
+                kwargs[TOKEN_KEYS[self.api]] = token
+            page = getattr(self.client, self.api)(Limit=limit, **kwargs)
+            yield page
+            token = page.get(TOKEN_KEYS[self.api])
+            if not token:
+                break
+
+
+class FakeCognitoClient:
+    """ A user pool in memory; see the module docstring """
+
+    exceptions = exceptions
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        throttle_rate: float = 0.0,
+        error_rate: float = 0.0,
+        quota_scale: float = 1.0,
+        groups: Optional[List[str]] = None,
+        seed: Optional[int] = None,
+    ):
+        """ latency is the median seconds per call, log-normally distributed
+        with sigma jitter; throttle_rate and error_rate are the probabilities
+        of a TooManyRequestsException or InternalErrorException on top of the
+        quotas (scaled by quota_scale, 0 turns them off) """
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.buckets = {
+            category: TokenBucket(rate * quota_scale)
+            for category, rate in CATEGORY_RATES.items()
+            if quota_scale
+        }
+        self.random = random.Random(seed)
+        self.lock = threading.RLock()
+        self.users: Dict[str, dict] = {}
+        self.groups: Dict[str, dict] = {}
+        self.calls: Counter = Counter()
+        self.errors: Counter = Counter()
+        for group in groups or []:
+            self.groups[group] = {"description": "", "members": {}}
+
+    def request(self, api: str):
+        """ Simulates the service side of a call before it is applied """
+        with self.lock:
+            self.calls[api] += 1
+            draw = self.random.random()
+            delay = (
+                self.latency * self.random.lognormvariate(0, self.jitter)
+                if self.latency
+                else 0.0
+            )
+        code = None
+        if self.buckets and self.buckets[API_CATEGORIES[api]].try_acquire():
+            code = "TooManyRequestsException"
+        elif draw < self.throttle_rate:
+            code = "TooManyRequestsException"
+        elif draw < self.throttle_rate + self.error_rate:
+            code = "InternalErrorException"
+        time.sleep(delay)
+        if code:
+            self.fail(code, "Injected by FakeCognitoClient", api)
+
+    def fail(self, code: str, message: str, api: str):
+        with self.lock:
+            self.errors[code] += 1
+        raise client_error(code, message, api)
+
+    def user(self, username: str, api: str) -> dict:
+        if username not in self.users:
+            self.fail("UserNotFoundException", "User does not exist.", api)
+        return self.users[username]
+
+    def group(self, group_name: str, api: str) -> dict:
+        if group_name not in self.groups:
+            self.fail("ResourceNotFoundException", "Group not found.", api)
+        return self.groups[group_name]
+
+    def aws_user(self, username: str) -> dict:
+        user = self.users[username]
+        return {
+            "Username": username,
+            "Attributes": [
+                {"Name": name, "Value": value}
+                for name, value in user["attributes"].items()
+            ],
+            "Enabled": user["enabled"],
+            "UserStatus": user["status"],
+        }
+
+    def admin_create_user(
+        self, UserPoolId, Username, UserAttributes=None, MessageAction=None
+    ):
+        self.request("admin_create_user")
+        with self.lock:
+            if MessageAction == "RESEND":
+                self.user(Username, "admin_create_user")
+            elif Username in self.users:
+                self.fail(
+                    "UsernameExistsException",
+                    "User account already exists.",
+                    "admin_create_user",
+                )
+            else:
+                self.users[Username] = {
+                    "attributes": {
+                        attr["Name"]: attr["Value"] for attr in UserAttributes or []
+                    },
+                    "enabled": True,
+                    "status": "FORCE_CHANGE_PASSWORD",
+                }
+            return ok(User=self.aws_user(Username))
+
+    def admin_add_user_to_group(self, UserPoolId, Username, GroupName):
+        self.request("admin_add_user_to_group")
+        with self.lock:
+            self.user(Username, "admin_add_user_to_group")
+            self.group(GroupName, "admin_add_user_to_group")["members"][Username] = None
+        return ok()
+
+    def admin_remove_user_from_group(self, UserPoolId, Username, GroupName):
+        self.request("admin_remove_user_from_group")
+        with self.lock:
+            self.user(Username, "admin_remove_user_from_group")
+            members = self.group(GroupName, "admin_remove_user_from_group")["members"]
+            members.pop(Username, None)
+        return ok()
+
+    def set_enabled(self, api, Username, enabled):
+        self.request(api)
+        with self.lock:
+            self.user(Username, api)["enabled"] = enabled
+        return ok()
+
+    def admin_disable_user(self, UserPoolId, Username):
+        return self.set_enabled("admin_disable_user", Username, False)
+
+    def admin_enable_user(self, UserPoolId, Username):
+        return self.set_enabled("admin_enable_user", Username, True)
+
+    def admin_delete_user(self, UserPoolId, Username):
+        self.request("admin_delete_user")
+        with self.lock:
+            self.user(Username, "admin_delete_user")
+            del self.users[Username]
+            for group in self.groups.values():
+                group["members"].pop(Username, None)
+        return ok()
+
+    def admin_set_user_password(self, UserPoolId, Username, Password, Permanent=False):
+        self.request("admin_set_user_password")
+        with self.lock:
+            user = self.user(Username, "admin_set_user_password")
+            user["status"] = "CONFIRMED" if Permanent else "FORCE_CHANGE_PASSWORD"
+        return ok()
+
+    def admin_update_user_attributes(self, UserPoolId, Username, UserAttributes):
+        self.request("admin_update_user_attributes")
+        with self.lock:
+            user = self.user(Username, "admin_update_user_attributes")
+            for attr in UserAttributes:
+                user["attributes"][attr["Name"]] = attr["Value"]
+        return ok()
+
+    def create_group(self, GroupName, UserPoolId, Description=""):
+        with self.lock:
+            self.groups[GroupName] = {"description": Description, "members": {}}
+        return ok(Group={"GroupName": GroupName, "Description": Description})
+
+    def list_groups(self, UserPoolId):
+        with self.lock:
+            groups = [
+                {"GroupName": name, "Description": group["description"]}
+                for name, group in self.groups.items()
+            ]
+        return ok(Groups=groups)
+
+    def page(self, usernames, token, limit, token_key):
+        start = int(token or 0)
+        page = {
+            "Users": [self.aws_user(name) for name in usernames[start : start + limit]]
+        }
+        if start + limit < len(usernames):
+            page[token_key] = str(start + limit)
+        return ok(**page)
+
+    def list_users(self, UserPoolId, PaginationToken=None, Limit=60):
+        self.request("list_users")
+        with self.lock:
+            return self.page(
+                list(self.users), PaginationToken, Limit, "PaginationToken"
+            )
+
+    def list_users_in_group(self, UserPoolId, GroupName, NextToken=None, Limit=60):
+        self.request("list_users_in_group")
+        with self.lock:
+            members = list(self.group(GroupName, "list_users_in_group")["members"])
+            return self.page(members, NextToken, Limit, "NextToken")
+
+    def get_paginator(self, api):
+        return FakePaginator(self, api)
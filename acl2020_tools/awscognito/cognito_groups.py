@@ -1,12 +1,19 @@
 # pylint: disable=global-statement,redefined-outer-name
 """ Script used to create|disable AWS Cognito user """
 import argparse
+import os
+import threading
+import time
 from dataclasses import dataclass
-from typing import Any, Dict
+from typing import Any, Dict, Set
 
 import yaml
+from tqdm import tqdm
 
 import cognito  # type: ignore
+import cognito_bulk  # type: ignore
+import cognito_metrics  # type: ignore
+import cognito_snapshot  # type: ignore
 
 
 @dataclass(frozen=True)
@@ -35,6 +42,71 @@ def load_data(aws_profile):
     return data
 
 
+class Checkpoint:
+    """ File of the usernames an interrupted group action already handled """
+
+    def __init__(self, path):
+        self.path = path
+        self.done: Set[str] = set()
+        if os.path.exists(path):
+            with open(path) as checkpoint_file:
+                self.done = {line.strip() for line in checkpoint_file if line.strip()}
+        self.file = open(path, "a")
+        self.lock = threading.Lock()
+
+    def add(self, username):
+        with self.lock:
+            self.file.write(username + "\n")
+            self.file.flush()
+
+    def close(self, remove=False):
+        self.file.close()
+        if remove:
+            os.remove(self.path)
+
+
+def run_group_action(args, data, group_name, enable):
+    """ Enables or disables every member of the group concurrently, skipping
+    the members the checkpoint file or the listing show as already done """
+    action = "enable" if enable else "disable"
+    checkpoint = Checkpoint(args.checkpoint or f"{action}_{group_name}.checkpoint")
+    pending = []
+    for user in cognito.iter_group_users(data["client"], data["profile"], group_name):
+        if user.username not in checkpoint.done and user.enabled != enable:
+            pending.append(user)
+    print(
+        f"{len(pending)} users of {group_name} to {action}"
+        + (f", resuming from {checkpoint.path}" if checkpoint.done else "")
+    )
+
+    executor = cognito_bulk.BulkExecutor(
+        data["client"], data["profile"], args.workers, args.rate_scale
+    )
+    step = cognito_bulk.enable_step if enable else cognito_bulk.disable_step
+    progress = tqdm(total=len(pending), unit="user")
+
+    def on_result(user, result):
+        if result.status == "ok":
+            checkpoint.add(user.username)
+        progress.update()
+
+    start = time.monotonic()
+    try:
+        results = executor.run_each(((user, [step]) for user in pending), on_result)
+    except KeyboardInterrupt:
+        checkpoint.close()
+        print(f"\nInterrupted; run again to resume from {checkpoint.path}")
+        raise
+    finally:
+        progress.close()
+    cognito_bulk.print_summary(results, time.monotonic() - start)
+    if args.results:
+        cognito_bulk.save_results(results, args.results)
+    # Nothing left to resume once every user went through
+    checkpoint.close(remove=all(result.status == "ok" for result in results))
+    cognito_snapshot.invalidate(args.snapshot)
+
+
 def parse_arguments():
     """ Parse Arguments """
     parser = argparse.ArgumentParser(
@@ -64,6 +136,15 @@ def parse_arguments():
         help="List available group(s) in the pool",
     )
     parser.add_argument("aws_profile", help="The file contains AWS profile")
+    parser.add_argument(
+        "--checkpoint",
+        help="File recording the users already disabled/enabled, so that a "
+        "rerun resumes (default: <disable|enable>_<group>.checkpoint)",
+    )
+    cognito_bulk.add_arguments(parser)
+    cognito_metrics.add_arguments(parser)
+    # --snapshot comes with the bulk options
+    cognito_snapshot.add_arguments(parser, path=False)
 
     return parser.parse_args()
 
@@ -71,24 +152,16 @@ def parse_arguments():
 if __name__ == "__main__":
     args = parse_arguments()
     data = load_data(args.aws_profile)
+    data["client"] = cognito_metrics.instrument(data["client"], args)
 
     # We can list groups, disable or enable group users now
     if args.list_groups:
         # List existing groups
-        groups = cognito.list_groups(data["client"], data["profile"])
+        source = cognito_snapshot.open_source(args, data["client"], data["profile"])
+        groups = source.list_groups()
         for group in groups:
             print(f"{group.name}:\t{group.description}")
     elif args.group_to_disable:
-        # Disable group users
-        users = cognito.list_group_users(
-            data["client"], data["profile"], args.group_to_disable
-        )
-        for user in users:
-            cognito.disable_user(data["client"], data["profile"], user)
+        run_group_action(args, data, args.group_to_disable, enable=False)
     elif args.group_to_enable:
-        # Enable group users
-        users = cognito.list_group_users(
-            data["client"], data["profile"], args.group_to_enable
-        )
-        for user in users:
-            cognito.enable_user(data["client"], data["profile"], user)
+        run_group_action(args, data, args.group_to_enable, enable=True)
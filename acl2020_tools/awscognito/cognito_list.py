@@ -1,12 +1,16 @@
 # pylint: disable=global-statement,redefined-outer-name
 """ Script used to list AWS Cognito users """
 import argparse
-from dataclasses import asdict, dataclass
+import csv
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, Set
 
-import pandas
 import yaml
 
 import cognito  # type: ignore
+import cognito_metrics  # type: ignore
+import cognito_snapshot  # type: ignore
 
 
 @dataclass()
@@ -22,54 +26,80 @@ class User:
     #     return f"{self.first_name} {self.last_name}"
 
 
-def find_duplicate(client, profile, is_debug=False):
-    result = []
-    users = []
-    groups = cognito.list_groups(client, profile)
-    for group in groups:
-        if is_debug:
-            print(f"{group.name}:\t{group.description}")
-        group_users = cognito.list_group_users(client, profile, group.name)
-        for group_user in group_users:
-            if is_debug:
-                print(group_user)
-            user = next((u for u in users if u.email == group_user.email), None)
-            if user:
-                user.committee = f"{user.committee}|{group.name}"
-            else:
-                users.append(
-                    User(
-                        name=group_user.name(),
-                        email=group_user.email,
-                        committee=group.name,
-                    )
-                )
-    for user in users:
-        groups = user.committee.split("|")
-        if len(groups) > 1:
-            # User in multiple groups
-            result.append(user)
+def group_memberships(source, is_debug=False, workers=4):
+    """ Lists every group concurrently and indexes the groups of each user
 
-    return result
+    source is a cognito_snapshot.Snapshot or LiveSource. Returns the group
+    names, {email: set of group names} and {email: name}.
+    """
+    groups = source.list_groups()
+    memberships: Dict[str, Set[str]] = {}
+    names: Dict[str, str] = {}
+
+    def fetch(group):
+        return group, list(source.iter_group_users(group.name))
+
+    with ThreadPoolExecutor(workers) as pool:
+        for group, group_users in pool.map(fetch, groups):
+            if is_debug:
+                print(f"{group.name}:\t{group.description}")
+            for group_user in group_users:
+                if is_debug:
+                    print(group_user)
+                memberships.setdefault(group_user.email, set()).add(group.name)
+                names.setdefault(group_user.email, group_user.name())
+
+    return [group.name for group in groups], memberships, names
+
+
+def find_duplicate(source, is_debug=False, workers=4):
+    group_names, memberships, names = group_memberships(source, is_debug, workers)
+    order = {name: i for i, name in enumerate(group_names)}
+    return [
+        User(
+            name=names[email],
+            email=email,
+            committee="|".join(sorted(groups, key=order.__getitem__)),
+        )
+        for email, groups in memberships.items()
+        if len(groups) > 1
+    ]
+
+
+def save_matrix(source, file_path, is_debug=False, workers=4):
+    """ Save a user x group membership table (1 = member) to the csv file """
+    group_names, memberships, names = group_memberships(source, is_debug, workers)
+    with open(file_path, "w", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["email", "name"] + group_names)
+        for email, groups in memberships.items():
+            writer.writerow(
+                [email, names[email]] + [int(name in groups) for name in group_names]
+            )
+    print(f"Membership of {len(memberships)} users is written to {file_path}")
+
+
+def open_source(args):
+    """ The pool snapshot (or the live pool with --live) """
+    profile = yaml.load(open(args.aws_profile).read(), Loader=yaml.SafeLoader)
+    client = cognito_metrics.instrument(cognito.init_client(profile), args)
+    return cognito_snapshot.open_source(args, client, profile, args.workers)
 
 
 def load_data(args):
-    """ Load the profile data and get pool users """
-    aws_profile = args.aws_profile
+    """ Load the profile data and yield pool users as they are listed """
     check_duplicate = args.duplicate
     group = args.group
     is_debug = args.debug
 
-    profile = yaml.load(open(aws_profile).read(), Loader=yaml.SafeLoader)
-    client = cognito.init_client(profile)
-    result = []
+    source = open_source(args)
 
     if group:
-        users = cognito.list_group_users(client, profile, group)
+        users = source.iter_group_users(group)
     elif check_duplicate:
-        users = find_duplicate(client, profile, is_debug)
+        users = find_duplicate(source, is_debug, args.workers)
     else:
-        users = cognito.list_users(client, profile)
+        users = source.iter_users()
     for user in users:
         if is_debug:
             if check_duplicate is False:
@@ -80,13 +110,11 @@ def load_data(args):
                     + f"user_status: {user.user_status}"
                 )
         if group:
-            result.append(User(name=user.name(), email=user.email, committee=group))
+            yield User(name=user.name(), email=user.email, committee=group)
         elif check_duplicate:
-            result.append(user)
+            yield user
         else:
-            result.append(User(name=user.name(), email=user.email))
-
-    return result
+            yield User(name=user.name(), email=user.email)
 
 
 def parse_arguments():
@@ -116,26 +144,47 @@ def parse_arguments():
         default=False,
         help="Get the users from the specified group only",
     )
+    group.add_argument(
+        "-m",
+        "--matrix",
+        action="store_true",
+        default=False,
+        help="Write the group membership of every user",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Groups listed concurrently for --duplicate and --matrix",
+    )
+    cognito_snapshot.add_arguments(parser)
+    cognito_metrics.add_arguments(parser)
     parser.add_argument("aws_profile", help="The file contains AWS profile")
 
     return parser.parse_args()
 
 
 def save_file(users, file_path):
-    """ Save user information to the csv file """
-    dataframe = pandas.DataFrame([asdict(x) for x in users])
-    dataframe.to_csv(file_path, index=False)
+    """ Save user information to the csv file, one row per user as it comes """
+    with open(file_path, "w", newline="") as csv_file:
+        writer = csv.DictWriter(csv_file, [field.name for field in fields(User)])
+        writer.writeheader()
+        for user in users:
+            writer.writerow(asdict(user))
     print(f"User information is written to {file_path}")
 
 
 if __name__ == "__main__":
     args = parse_arguments()
-    users = load_data(args)
-
-    if args.group:
-        file_name = f"all_{args.group}.csv"
-    elif args.duplicate:
-        file_name = "duplicate.csv"
+    if args.matrix:
+        save_matrix(open_source(args), "membership.csv", args.debug, args.workers)
     else:
-        file_name = "all_users.csv"
-    save_file(users, file_name)
+        users = load_data(args)
+
+        if args.group:
+            file_name = f"all_{args.group}.csv"
+        elif args.duplicate:
+            file_name = "duplicate.csv"
+        else:
+            file_name = "all_users.csv"
+        save_file(users, file_name)
@@ -0,0 +1,185 @@
+# pylint: disable=global-statement,redefined-outer-name
+""" Latency, outcome and retry metrics of the Cognito API calls
+
+instrument() wraps a client (boto3 or cognito_fake) so that every call, and
+every page fetched through its paginators, is timed and counted by API and
+outcome (ok or the error code) in the process-wide `metrics`. The bulk
+executor adds its retries. The scripts enable this with --metrics FILE and
+the metrics are written when they exit, as JSON or, for .prom files, in the
+Prometheus text format.
+"""
+import atexit
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+from botocore.exceptions import ClientError
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+THROTTLE_CODES = {"TooManyRequestsException", "ThrottlingException"}
+
+
+class Metrics:
+    """ Thread-safe per-API latency histograms and counters """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms: Dict[str, List[int]] = defaultdict(
+            lambda: [0] * (len(BUCKETS) + 1)
+        )
+        self.seconds: Counter = Counter()
+        self.outcomes: Dict[str, Counter] = defaultdict(Counter)
+        self.retries: Counter = Counter()
+
+    def observe(self, api: str, seconds: float, outcome: str):
+        bucket = next(
+            (i for i, bound in enumerate(BUCKETS) if seconds <= bound), len(BUCKETS)
+        )
+        with self.lock:
+            self.histograms[api][bucket] += 1
+            self.seconds[api] += seconds
+            self.outcomes[api][outcome] += 1
+
+    def retried(self, api: str, retries: int):
+        if retries:
+            with self.lock:
+                self.retries[api] += retries
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            apis = {}
+            for api in sorted(set(self.histograms) | set(self.retries)):
+                counts = self.histograms[api]
+                cumulative = [sum(counts[: i + 1]) for i in range(len(BUCKETS))]
+                outcomes = self.outcomes[api]
+                apis[api] = {
+                    "count": sum(counts),
+                    "seconds": round(self.seconds[api], 6),
+                    "buckets": dict(zip(map(str, BUCKETS), cumulative)),
+                    "outcomes": dict(outcomes),
+                    "throttled": sum(outcomes[code] for code in THROTTLE_CODES),
+                    "retries": self.retries[api],
+                }
+            return apis
+
+    def to_prometheus(self) -> str:
+        apis = self.to_dict()
+        histogram = "cognito_request_duration_seconds"
+        lines = [
+            f"# HELP {histogram} Latency of Cognito API calls",
+            f"# TYPE {histogram} histogram",
+        ]
+        for api, api_metrics in apis.items():
+            buckets = list(api_metrics["buckets"].items())
+            buckets.append(("+Inf", api_metrics["count"]))
+            lines += [
+                f'{histogram}_bucket{{api="{api}",le="{bound}"}} {count}'
+                for bound, count in buckets
+            ]
+            lines += [
+                f'{histogram}_sum{{api="{api}"}} {api_metrics["seconds"]}',
+                f'{histogram}_count{{api="{api}"}} {api_metrics["count"]}',
+            ]
+        lines += [
+            "# HELP cognito_requests_total Cognito API calls by outcome",
+            "# TYPE cognito_requests_total counter",
+        ]
+        for api, api_metrics in apis.items():
+            for outcome, count in sorted(api_metrics["outcomes"].items()):
+                lines.append(
+                    f'cognito_requests_total{{api="{api}",outcome="{outcome}"}} {count}'
+                )
+        for name, key, description in [
+            ("cognito_throttled_total", "throttled", "Throttled Cognito API calls"),
+            ("cognito_retries_total", "retries", "Retries of throttled calls"),
+        ]:
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} counter"]
+            for api, api_metrics in apis.items():
+                lines.append(f'{name}{{api="{api}"}} {api_metrics[key]}')
+        return "\n".join(lines) + "\n"
+
+    def save(self, file_path: str):
+        with open(file_path, "w") as metrics_file:
+            if file_path.endswith(".prom"):
+                metrics_file.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), metrics_file, indent=2)
+        print(f"Metrics are written to {file_path}")
+
+
+metrics = Metrics()
+
+
+def error_code(error: ClientError) -> str:
+    return error.response.get("Error", {}).get("Code", "Error")
+
+
+def timed(api: str, func):
+    def call(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = func(*args, **kwargs)
+        except ClientError as error:
+            metrics.observe(api, time.perf_counter() - start, error_code(error))
+            raise
+        metrics.observe(api, time.perf_counter() - start, "ok")
+        return response
+
+    return call
+
+
+class InstrumentedPaginator:
+    """ Times each page a wrapped paginator fetches """
+
+    def __init__(self, paginator, api):
+        self.paginator = paginator
+        self.api = api
+
+    def paginate(self, **kwargs):
+        pages = iter(self.paginator.paginate(**kwargs))
+        while True:
+            start = time.perf_counter()
+            try:
+                page = next(pages)
+            except StopIteration:
+                return
+            except ClientError as error:
+                metrics.observe(self.api, time.perf_counter() - start, error_code(error))
+                raise
+            metrics.observe(self.api, time.perf_counter() - start, "ok")
+            yield page
+
+
+class InstrumentedClient:
+    """ Proxy recording the metrics of every API call made through it """
+
+    def __init__(self, client):
+        self.client = client
+        self.exceptions = client.exceptions
+
+    def get_paginator(self, api):
+        return InstrumentedPaginator(self.client.get_paginator(api), api)
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        return timed(name, attr) if callable(attr) else attr
+
+
+def add_arguments(parser):
+    """ Adds the --metrics option to a script's argument parser """
+    parser.add_argument(
+        "--metrics",
+        help="Write latency/outcome/retry metrics of the Cognito calls to this "
+        "file when done (JSON, or Prometheus text for .prom files)",
+    )
+
+
+def instrument(client, args):
+    """ The client, instrumented when --metrics was given """
+    if not getattr(args, "metrics", None):
+        return client
+    atexit.register(metrics.save, args.metrics)
+    return InstrumentedClient(client)
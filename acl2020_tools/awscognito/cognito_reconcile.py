@@ -0,0 +1,188 @@
+# pylint: disable=global-statement,redefined-outer-name
+""" Compute and apply only the Cognito changes an input user file requires """
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import cognito  # type: ignore
+import cognito_bulk  # type: ignore
+import cognito_snapshot  # type: ignore
+
+
+@dataclass
+class Change:
+    """ Steps planned for one user, with a description of each """
+
+    user: object
+    steps: List[cognito_bulk.Step] = field(default_factory=list)
+    notes: List[str] = field(default_factory=list)
+
+    def add(self, step, note):
+        self.steps.append(step)
+        self.notes.append(note)
+
+
+def display_name(user) -> str:
+    return user.name() if callable(user.name) else user.name
+
+
+def snapshot(
+    client, profile, group=None
+) -> Tuple[Dict[str, object], Dict[str, object]]:
+    """ Current pool users and members of the group, by email """
+    pool = {user.email: user for user in cognito.iter_users(client, profile)}
+    members = {}
+    if group:
+        members = {
+            user.email: user
+            for user in cognito.iter_group_users(client, profile, group)
+        }
+    return pool, members
+
+
+def unique_users(users) -> list:
+    """ The users in file order, keeping the first row of a repeated email """
+    unique: Dict[str, object] = {}
+    for user in users:
+        unique.setdefault(user.email, user)
+    return list(unique.values())
+
+
+def missing_users(args, users, pool) -> List[str]:
+    """ Emails the operation applies to that are not in the pool, so are
+    skipped (only creation handles them) """
+    if not (args.disable or args.enable or args.remove_from_group or args.verified):
+        return []
+    return [user.email for user in unique_users(users) if user.email not in pool]
+
+
+def plan_changes(args, users, pool, members, prune=False) -> List[Change]:
+    """ Diffs the input users against the pool for the selected operation """
+    changes: Dict[str, Change] = {}
+    users = unique_users(users)
+
+    def change(user):
+        if user.email not in changes:
+            changes[user.email] = Change(user)
+        return changes[user.email]
+
+    for user in users:
+        current = pool.get(user.email)
+        if args.disable or args.enable:
+            if current and current.enabled != bool(args.enable):
+                step = (
+                    cognito_bulk.enable_step
+                    if args.enable
+                    else cognito_bulk.disable_step
+                )
+                change(user).add(step, step.name)
+        elif args.remove_from_group:
+            if user.email in members:
+                change(user).add(
+                    cognito_bulk.remove_step(args.remove_from_group),
+                    f"remove from {args.remove_from_group}",
+                )
+        elif args.verified:
+            if current and current.email_verified != "true":
+                change(user).add(
+                    cognito_bulk.attribute_step("email_verified", "true"),
+                    "set email_verified: "
+                    f"{current.email_verified or '(unset)'!r} -> 'true'",
+                )
+        else:
+            name = display_name(user)
+            if current is None:
+                change(user).add(cognito_bulk.create_step(), f"create ({name})")
+            else:
+                if current.custom_name != name:
+                    change(user).add(
+                        cognito_bulk.attribute_step("custom:name", name),
+                        f"set custom:name: {current.custom_name!r} -> {name!r}",
+                    )
+                if current.email_verified != "true":
+                    change(user).add(
+                        cognito_bulk.attribute_step("email_verified", "true"),
+                        "set email_verified: "
+                        f"{current.email_verified or '(unset)'!r} -> 'true'",
+                    )
+            if args.group and user.email not in members:
+                change(user).add(
+                    cognito_bulk.add_step(args.group), f"add to {args.group}"
+                )
+
+    if prune and args.group:
+        listed = {user.email for user in users}
+        for email in sorted(set(members) - listed):
+            change(members[email]).add(
+                cognito_bulk.remove_step(args.group), f"remove from {args.group}"
+            )
+    return list(changes.values())
+
+
+def print_plan(changes: List[Change], users, missing=()):
+    for planned in changes:
+        for note in planned.notes:
+            print(f"{planned.user.email}: {note}")
+    for email in missing:
+        print(f"{email}: not in the pool, skipped")
+    listed = {user.email for user in users}
+    up_to_date = (
+        len(listed)
+        - sum(planned.user.email in listed for planned in changes)
+        - len(missing)
+    )
+    steps = sum(len(planned.steps) for planned in changes)
+    print(
+        f"{steps} requests for {len(changes)} users; "
+        f"{up_to_date} of the {len(listed)} users in the file are up to date"
+        + (f", {len(missing)} are not in the pool" if missing else "")
+    )
+
+
+def add_arguments(parser):
+    """ Adds the reconcile options to a script's argument parser """
+    parser.add_argument(
+        "--reconcile",
+        action="store_true",
+        default=False,
+        help="Compare the file with the pool first and only send the requests "
+        "needed to bring the pool in line with it",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        default=False,
+        help="Show the changes --reconcile would make without applying them",
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        default=False,
+        help="With --reconcile -a group, also remove group members that are "
+        "not in the file",
+    )
+
+
+def run_from_args(args, client, profile, users):
+    """ Plans the operation selected by args and applies it unless --plan """
+    start = time.monotonic()
+    group = args.group or args.remove_from_group
+    pool, members = snapshot(client, profile, group)
+    print(
+        f"Read {len(pool)} pool users"
+        + (f" and {len(members)} members of {group}" if group else "")
+        + f" in {time.monotonic() - start:.1f}s"
+    )
+    changes = plan_changes(args, users, pool, members, args.prune)
+    print_plan(changes, users, missing_users(args, users, pool))
+    if args.plan or not changes:
+        return []
+
+    executor = cognito_bulk.BulkExecutor(client, profile, args.workers, args.rate_scale)
+    start = time.monotonic()
+    results = executor.run_each((planned.user, planned.steps) for planned in changes)
+    cognito_snapshot.invalidate(args.snapshot)
+    cognito_bulk.print_summary(results, time.monotonic() - start, args.debug)
+    if args.results:
+        cognito_bulk.save_results(results, args.results)
+    return results
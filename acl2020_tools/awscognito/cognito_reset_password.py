@@ -1,11 +1,17 @@
 # pylint: disable=global-statement,redefined-outer-name
 """ Script used to reset password of AWS Cognito users """
 import argparse
+import csv
+import time
 from dataclasses import dataclass
+from typing import List
 
 import yaml
 
 import cognito  # type: ignore
+import cognito_bulk  # type: ignore
+import cognito_metrics  # type: ignore
+import cognito_snapshot  # type: ignore
 
 
 @dataclass(frozen=True)
@@ -38,40 +44,70 @@ def parse_arguments():
         default=False,
         help="Set specified password to the users",
     )
+    parser.add_argument(
+        "-f",
+        "--file",
+        help="CSV file with an email column of the users to have password reset",
+    )
+    cognito_bulk.add_arguments(parser)
+    cognito_metrics.add_arguments(parser)
     parser.add_argument("aws_profile", help="The file contains AWS profile")
     parser.add_argument(
         "emails",
         metavar="email",
         type=str,
-        nargs="+",
+        nargs="*",
         help="E-mail address of user to have password reset",
     )
 
-    return parser.parse_args()
+    args = parser.parse_args()
+    if not args.emails and not args.file:
+        parser.error("give the users' emails or a --file")
+    if args.file and not args.results:
+        args.results = "reset_results.jsonl"
+    return args
+
+
+def read_emails(path) -> List[str]:
+    """ Reads the email column (any capitalization) of the CSV file """
+    with open(path, newline="") as csv_file:
+        reader = csv.DictReader(csv_file)
+        column = next(
+            (
+                name
+                for name in reader.fieldnames or []
+                if name.strip().lower() == "email"
+            ),
+            None,
+        )
+        if column is None:
+            raise ValueError(f"{path} has no email column")
+        return [row[column].strip() for row in reader if row[column].strip()]
 
 
 def reset_password(args):
     """ Load the profile data and reset password of users (by email address) """
-    aws_profile = args.aws_profile
-    emails = args.emails
-    is_debug = args.debug
-    password = args.password
-    profile = yaml.load(open(aws_profile).read(), Loader=yaml.SafeLoader)
-    client = cognito.init_client(profile)
-    result = []
-
-    for email in emails:
-        if args.password:
-            response = cognito.set_user_password(
-                client, profile, User(email=email), password
-            )
-        else:
-            response = cognito.reset_user_password(client, profile, User(email=email))
-        cognito.show_error_response(response, is_debug)
-
-    return result
+    profile = yaml.load(open(args.aws_profile).read(), Loader=yaml.SafeLoader)
+    client = cognito_metrics.instrument(cognito.init_client(profile), args)
+
+    emails = list(args.emails)
+    if args.file:
+        emails.extend(read_emails(args.file))
+    users = [User(email=email) for email in dict.fromkeys(emails)]
+
+    # Different users' set-password and resend calls overlap on the pool, each
+    # API limited to its own quota
+    executor = cognito_bulk.BulkExecutor(client, profile, args.workers, args.rate_scale)
+    start = time.monotonic()
+    results = executor.run(users, cognito_bulk.password_steps(args.password))
+    # The users' status changes (e.g. to FORCE_CHANGE_PASSWORD)
+    cognito_snapshot.invalidate(args.snapshot)
+    cognito_bulk.print_summary(results, time.monotonic() - start, args.debug)
+    if args.results:
+        cognito_bulk.save_results(results, args.results)
+    return results
 
 
 if __name__ == "__main__":
     args = parse_arguments()
-    users = reset_password(args)
+    results = reset_password(args)
@@ -0,0 +1,229 @@
+# pylint: disable=global-statement,redefined-outer-name
+""" Local SQLite snapshot of the pool's users, groups and memberships
+
+Read-only reports query the snapshot instead of listing the pool through the
+API every time. It is refreshed when older than --ttl seconds, with --refresh,
+or when it was taken from another pool, and the write tools mark it stale.
+"""
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List
+
+import cognito  # type: ignore
+from cognito import CognitoGroup, CognitoUser  # type: ignore
+
+DEFAULT_PATH = os.environ.get("COGNITO_SNAPSHOT", "cognito_snapshot.sqlite")
+DEFAULT_TTL = 900
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    email TEXT,
+    custom_name TEXT,
+    user_status TEXT,
+    email_verified TEXT,
+    enabled INTEGER
+);
+CREATE INDEX IF NOT EXISTS users_email ON users (email);
+CREATE TABLE IF NOT EXISTS pool_groups (name TEXT PRIMARY KEY, description TEXT);
+CREATE TABLE IF NOT EXISTS memberships (
+    group_name TEXT,
+    username TEXT,
+    PRIMARY KEY (group_name, username)
+);
+"""
+
+USER_COLUMNS = "username, email, custom_name, user_status, email_verified, enabled"
+
+
+def user_row(user: CognitoUser):
+    return (
+        user.username,
+        user.email,
+        user.custom_name,
+        user.user_status,
+        user.email_verified,
+        int(user.enabled),
+    )
+
+
+def row_user(row) -> CognitoUser:
+    username, email, custom_name, user_status, email_verified, enabled = row
+    return CognitoUser(
+        username=username,
+        email=email,
+        custom_name=custom_name,
+        user_status=user_status,
+        email_verified=email_verified,
+        enabled=bool(enabled),
+    )
+
+
+class LiveSource:
+    """ Lists the pool through the API """
+
+    def __init__(self, client, profile):
+        self.client = client
+        self.profile = profile
+
+    def list_groups(self) -> List[CognitoGroup]:
+        return cognito.list_groups(self.client, self.profile)
+
+    def iter_users(self) -> Iterator[CognitoUser]:
+        return cognito.iter_users(self.client, self.profile)
+
+    def iter_group_users(self, group_name) -> Iterator[CognitoUser]:
+        return cognito.iter_group_users(self.client, self.profile, group_name)
+
+
+class Snapshot:
+    """ Same listing methods as LiveSource, answered from the SQLite file """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.connection.execute(sql, params).fetchall()
+
+    def meta(self, key):
+        rows = self.query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    def is_fresh(self, ttl: float, user_pool_id: str) -> bool:
+        refreshed_at = self.meta("refreshed_at")
+        return (
+            refreshed_at is not None
+            and self.meta("user_pool_id") == user_pool_id
+            and time.time() - float(refreshed_at) < ttl
+        )
+
+    def refresh(self, client, profile, workers=4):
+        """ Replaces the snapshot with the current pool, listing the users and
+        every group's members concurrently """
+        start = time.monotonic()
+        groups = cognito.list_groups(client, profile)
+        with ThreadPoolExecutor(workers) as pool:
+            users = pool.submit(lambda: list(cognito.iter_users(client, profile)))
+            members = list(
+                pool.map(
+                    lambda group: list(
+                        cognito.iter_group_users(client, profile, group.name)
+                    ),
+                    groups,
+                )
+            )
+            users = users.result()
+
+        with self.lock, self.connection:
+            for table in ["users", "pool_groups", "memberships", "meta"]:
+                self.connection.execute(f"DELETE FROM {table}")
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO users ({USER_COLUMNS}) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [user_row(user) for user in users],
+            )
+            self.connection.executemany(
+                "INSERT INTO pool_groups VALUES (?, ?)",
+                [(group.name, group.description) for group in groups],
+            )
+            for group, group_users in zip(groups, members):
+                # Users created while the pool was being listed
+                self.connection.executemany(
+                    f"INSERT OR IGNORE INTO users ({USER_COLUMNS}) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [user_row(user) for user in group_users],
+                )
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO memberships VALUES (?, ?)",
+                    [(group.name, user.username) for user in group_users],
+                )
+            self.connection.executemany(
+                "INSERT INTO meta VALUES (?, ?)",
+                [
+                    ("user_pool_id", profile["user_pool_id"]),
+                    ("refreshed_at", repr(time.time())),
+                ],
+            )
+        print(
+            f"Snapshot of {len(users)} users and {len(groups)} groups written to "
+            f"{self.path} in {time.monotonic() - start:.1f}s"
+        )
+
+    def list_groups(self) -> List[CognitoGroup]:
+        return [
+            CognitoGroup(name=name, description=description)
+            for name, description in self.query(
+                "SELECT name, description FROM pool_groups ORDER BY rowid"
+            )
+        ]
+
+    def iter_users(self) -> Iterator[CognitoUser]:
+        rows = self.query(f"SELECT {USER_COLUMNS} FROM users ORDER BY rowid")
+        return map(row_user, rows)
+
+    def iter_group_users(self, group_name) -> Iterator[CognitoUser]:
+        rows = self.query(
+            f"SELECT {USER_COLUMNS} FROM users JOIN memberships USING (username) "
+            "WHERE group_name = ? ORDER BY memberships.rowid",
+            (group_name,),
+        )
+        return map(row_user, rows)
+
+
+def invalidate(path=DEFAULT_PATH):
+    """ Marks the snapshot stale after the pool was changed """
+    if os.path.exists(path):
+        with sqlite3.connect(path) as connection:
+            connection.execute("DELETE FROM meta WHERE key = 'refreshed_at'")
+
+
+def add_path_argument(parser):
+    """ Adds --snapshot, also used by the write tools to mark it stale """
+    parser.add_argument(
+        "--snapshot",
+        default=DEFAULT_PATH,
+        help=f"SQLite snapshot of the pool (default: {DEFAULT_PATH})",
+    )
+
+
+def add_arguments(parser, path=True):
+    """ Adds the snapshot options to a read-only script's argument parser;
+    path=False when --snapshot was already added by add_path_argument """
+    if path:
+        add_path_argument(parser)
+    parser.add_argument(
+        "--ttl",
+        type=float,
+        default=DEFAULT_TTL,
+        help="Seconds after which the snapshot is taken again",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        default=False,
+        help="Take a new snapshot of the pool first",
+    )
+    parser.add_argument(
+        "--live",
+        action="store_true",
+        default=False,
+        help="List the pool through the API instead of the snapshot",
+    )
+
+
+def open_source(args, client, profile, workers=4):
+    """ The snapshot selected by args, refreshed if needed, or the live pool """
+    if args.live:
+        return LiveSource(client, profile)
+    snapshot = Snapshot(args.snapshot)
+    if args.refresh or not snapshot.is_fresh(args.ttl, profile["user_pool_id"]):
+        snapshot.refresh(client, profile, workers)
+    return snapshot
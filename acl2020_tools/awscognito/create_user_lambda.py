@@ -3,8 +3,23 @@
 # to create a user in the 'attendees' user group in Cognito
 # pool in the same region
 #
+# The event is either a single signup ({"email": ..., "name": ...}) or an SQS
+# batch whose record bodies are such signups. Batches are deduplicated by
+# email, created concurrently, and only the records of signups that failed for
+# a transient reason (RETRYABLE_CODES) are reported back
+# (ReportBatchItemFailures) so that SQS retries just those. Malformed records
+# and signups Cognito rejects are logged and dropped: redelivering them would
+# fail the same way until the queue's redrive limit.
+#
 # Configuration:
 #  ACL2020_USER_POOL_ID - environment variable specifying
+#  ACL2020_USER_GROUP - group of the new users (default: attendees)
+#  ACL2020_LAMBDA_WORKERS - concurrent Cognito requests per batch (default: 8)
+#
+# Throttled calls are retried at most MAX_ATTEMPTS times and never past
+# TIME_MARGIN seconds before the lambda's timeout, so that signups that could
+# not be created in time are reported as batch item failures instead of the
+# whole batch timing out.
 #
 # IAM policies for the lambda's role:
 #  AWSLambdaBasicExecutionRole - required by default
@@ -12,14 +27,23 @@
 #
 # Runtime:
 #   Python 3.7
+#
+# The lambda can't reach the operators' local cognito_snapshot.sqlite files, so
+# users it creates only show up in the reports once a snapshot is older than
+# its --ttl (or with --refresh / --live).
+#
+# Package with cognito.py, cognito_bulk.py, cognito_metrics.py and
+# cognito_snapshot.py (cognito_fake.py is only imported for "backend: fake")
 
 import json
 import os
+import time
 from dataclasses import dataclass
+from typing import Dict, List
 
 import boto3
 
-import cognito  # type: ignore
+import cognito_bulk  # type: ignore
 
 
 @dataclass(frozen=True)
@@ -31,21 +55,88 @@ class User:
     committee: str = ""
 
 
+# Created once per container and reused by warm invocations
 profile = {"user_pool_id": os.environ["ACL2020_USER_POOL_ID"]}
 client = boto3.client("cognito-idp")
+group = os.environ.get("ACL2020_USER_GROUP", "attendees")
+workers = int(os.environ.get("ACL2020_LAMBDA_WORKERS", "8"))
+
+MAX_ATTEMPTS = 4
+TIME_MARGIN = 5.0
+
+# Outcomes worth another delivery; DeadlineExceeded users were never started
+RETRYABLE_CODES = cognito_bulk.THROTTLE_CODES | {
+    "DeadlineExceeded",
+    "InternalErrorException",
+    "EndpointConnectionError",
+    "ConnectTimeoutError",
+    "ReadTimeoutError",
+}
+
+
+def parse_signup(body) -> User:
+    signup = json.loads(body) if isinstance(body, str) else body
+    return User(email=signup["email"].strip(), name=signup["name"].strip())
+
+
+def handle_batch(records, client, profile, group, workers, deadline=None) -> List[str]:
+    """ Creates the users of a batch of SQS records and adds them to the group,
+    returning the messageIds of the records to retry; deadline is a
+    time.monotonic() value after which no more requests are sent """
+    failed: List[str] = []
+    duplicates = dropped = 0
+    signups: Dict[str, User] = {}
+    message_ids: Dict[str, List[str]] = {}
+    for record in records:
+        try:
+            user = parse_signup(record["body"])
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            print(f"Dropping invalid signup in {record['messageId']}: {error!r}")
+            dropped += 1
+            continue
+        key = user.email.lower()
+        duplicates += key in signups
+        signups.setdefault(key, user)
+        message_ids.setdefault(key, []).append(record["messageId"])
 
+    executor = cognito_bulk.BulkExecutor(
+        client, profile, workers, max_attempts=MAX_ATTEMPTS, deadline=deadline
+    )
+    steps = [cognito_bulk.create_step(), cognito_bulk.add_step(group)]
+    results = executor.run_each((user, steps) for user in signups.values())
+    for key, result in zip(signups, results):
+        if result.status == "ok":
+            continue
+        print(f"Signup of {result.email} failed: {result.steps} {result.error}")
+        if result.status in RETRYABLE_CODES:
+            failed.extend(message_ids[key])
+        else:
+            dropped += len(message_ids[key])
 
-def lambda_handler(event, _context):
-    print("Received event: " + json.dumps(event, indent=2))
+    print(
+        f"{len(records)} records, {len(signups)} signups, "
+        f"{duplicates} duplicates, {dropped} dropped, {len(failed)} to retry"
+    )
+    return failed
 
-    email, name = event["email"], event["name"]
 
-    user = User(email=email, name=name)
+def deadline_of(context):
+    remaining = context.get_remaining_time_in_millis() / 1000
+    return time.monotonic() + max(0.0, remaining - TIME_MARGIN)
 
-    response = cognito.create_user(client, profile, user)
-    cognito.show_error_response(response)
 
-    response = cognito.add_to_group(client, profile, user, "attendees")
-    cognito.show_error_response(response)
+def lambda_handler(event, context):
+    deadline = deadline_of(context)
+    if "Records" not in event:
+        handle_batch(
+            [{"messageId": "direct", "body": event}],
+            client,
+            profile,
+            group,
+            1,
+            deadline,
+        )
+        return "OK"
 
-    return "OK"
+    failed = handle_batch(event["Records"], client, profile, group, workers, deadline)
+    return {"batchItemFailures": [{"itemIdentifier": id_} for id_ in failed]}
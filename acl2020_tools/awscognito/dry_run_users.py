@@ -9,6 +9,9 @@ import pandas
 import yaml
 
 import cognito  # type: ignore
+import cognito_bulk  # type: ignore
+import cognito_metrics  # type: ignore
+import cognito_reconcile  # type: ignore
 
 
 @dataclass(frozen=True)
@@ -98,6 +101,9 @@ def parse_arguments():
         "user_file", help="The file contains user information for AWS Cognito",
     )
     parser.add_argument("aws_profile", help="The file contains AWS profile")
+    cognito_bulk.add_arguments(parser)
+    cognito_metrics.add_arguments(parser)
+    cognito_reconcile.add_arguments(parser)
 
     return parser.parse_args()
 
@@ -146,42 +152,17 @@ def parse_file(path):
 if __name__ == "__main__":
     args = parse_arguments()
     data = load_data(args.user_file, args.aws_profile)
+    data["client"] = cognito_metrics.instrument(data["client"], args)
 
     # We can check, create, disable or enable user now
     if args.check:
         for user in data["users"]:
             print(user)
-    elif args.disable:
-        # Disable user
-        for user in data["users"]:
-            response = cognito.disable_user(data["client"], data["profile"], user)
-            cognito.show_error_response(response, args.debug)
-    elif args.enable:
-        # Enable user
-        for user in data["users"]:
-            response = cognito.enable_user(data["client"], data["profile"], user)
-            cognito.show_error_response(response, args.debug)
-    elif args.remove_from_group:
-        # Remove users from group
-        for user in data["users"]:
-            response = cognito.remove_from_group(
-                data["client"], data["profile"], user, args.remove_from_group
-            )
-            cognito.show_error_response(response, args.debug)
-    elif args.verified:
-        # Enable user
-        for user in data["users"]:
-            response = cognito.update_user_attributes(
-                data["client"], data["profile"], user, "email_verified", "true"
-            )
-            cognito.show_error_response(response, args.debug)
+    elif args.reconcile or args.plan:
+        cognito_reconcile.run_from_args(
+            args, data["client"], data["profile"], data["users"]
+        )
     else:
-        # Create user
-        for user in data["users"]:
-            response = cognito.create_user(data["client"], data["profile"], user)
-            cognito.show_error_response(response, args.debug)
-            if args.group:
-                response = cognito.add_to_group(
-                    data["client"], data["profile"], user, args.group
-                )
-                cognito.show_error_response(response, args.debug)
+        cognito_bulk.run_from_args(
+            args, data["client"], data["profile"], data["users"]
+        )
@@ -3,9 +3,10 @@ import sys
 
 import pandas as pd
 import yaml
-from requests import sessions
 from rocketchat_API.rocketchat import RocketChat
 
+import rocket_jobs  # type: ignore
+
 
 def parse_arguments():
     parser = argparse.ArgumentParser(
@@ -32,6 +33,12 @@ def parse_arguments():
         action="store_true",
         help="Set all users as the owner of the channel they're added to.",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Number of channels users are added to concurrently",
+    )
     parser.add_argument("--test", action="store_true", help="Do dry run")
     return parser.parse_args()
 
@@ -50,87 +57,122 @@ def load_pandas(path):
         sys.exit(1)
 
 
-def find_user_id(email, user_dump):
-    found_id = user_dump[user_dump.emails.apply(lambda x: email in x)]["_id"]
-    assert len(found_id) != 0, 'No user found registered with email "{}"'.format(email)
-    assert (
-        len(found_id) == 1
-    ), '>1 user found registered with email "{}" (this should not happen)'.format(email)
-    return found_id.values[0]
-
-
-def add_user_to_channel(user_data, rocket, test):
-    if not test:
-        rocket.channels_invite(
-            roomId=user_data["channel_id"], userId=user_data["user_id"]
+def email_index(user_dump):
+    """ Every email alias (lowercased) with the _id of the user registered with
+    it, and whether several users share that alias """
+    aliases = user_dump[["_id", "emails"]].explode("emails")
+    aliases["email_key"] = aliases["emails"].astype(str).str.strip().str.lower()
+    aliases = aliases[aliases["emails"].notna() & (aliases["email_key"] != "")]
+    aliases = aliases.drop_duplicates(["email_key", "_id"])
+    aliases["ambiguous"] = aliases.groupby("email_key")["_id"].transform("size") > 1
+    return aliases.drop_duplicates("email_key")[["email_key", "_id", "ambiguous"]]
+
+
+def resolve_user_ids(assignments, user_dump):
+    """ Adds the user_id of each row's email, which is missing for unknown or
+    ambiguous emails, with the reason in the error column """
+    index = email_index(user_dump).rename(columns={"_id": "user_id"})
+    resolved = assignments.assign(
+        email_key=assignments["email"].astype(str).str.strip().str.lower()
+    ).merge(index, how="left", on="email_key")
+    ambiguous = resolved["ambiguous"].eq(True)
+    resolved.loc[ambiguous, "user_id"] = None
+    resolved["error"] = None
+    resolved.loc[resolved["user_id"].isna(), "error"] = "No user found registered"
+    resolved.loc[ambiguous, "error"] = ">1 user found registered"
+    return resolved.drop(columns=["email_key", "ambiguous"])
+
+
+def add_users_to_channel(rows, rocket, limiter, set_owner):
+    """ Invites the rows' users to their (common) channel, setting each one
+    as owner once invited; returns the error of every row, or None """
+    errors = []
+    for row in rows.itertuples():
+        error = rocket_jobs.api_error(
+            limiter.call(rocket.channels_invite, row.channel_id, row.user_id)
         )
-    print(
-        "Added user {} to channel {}".format(
-            user_data["email"], user_data["channel_name"]
-        )
-    )
-
-
-def set_user_as_owner(user_data, rocket, test):
-    if not test:
-        rocket.channels_add_owner(
-            roomId=user_data["channel_id"], userId=user_data["user_id"]
-        )
-    print(
-        "Set user {} as owner of channel {}".format(
-            user_data["email"], user_data["channel_name"]
-        )
-    )
+        if error is not None:
+            error = "Invite failed: {}".format(error)
+        elif set_owner:
+            error = rocket_jobs.api_error(
+                limiter.call(
+                    rocket.channels_add_owner, row.channel_id, user_id=row.user_id
+                )
+            )
+            if error is not None:
+                error = "Setting owner failed: {}".format(error)
+        errors.append(error)
+    return errors
 
 
 def main():
     args = parse_arguments()
     config = yaml.load(open(args.config))
 
-    with sessions.Session() as session:
-        rocket = RocketChat(
-            user_id=config["user_id"],
-            auth_token=config["auth_token"],
-            server_url=config["server"],
-            session=session,
-        )
-
-        user_dump = load_pandas(args.user_dump)
-        channel_dump = load_pandas(args.channel_dump)
-        channel_dump.rename(
-            columns={"_id": "channel_id", "name": "channel_name"}, inplace=True
-        )
-        user_to_channel = load_pandas(args.input)
-
-        assert "emails" in user_dump, "User dump file doesn't have an email column"
-        user_dump["emails"] = user_dump["emails"].apply(
-            lambda x: x.split("|") if isinstance(x, str) else ""
-        )
+    user_dump = load_pandas(args.user_dump)
+    channel_dump = load_pandas(args.channel_dump)
+    channel_dump.rename(
+        columns={"_id": "channel_id", "name": "channel_name"}, inplace=True
+    )
+    user_to_channel = load_pandas(args.input)
 
-        desired_channels = set(user_to_channel["channel"])
-        existing_channels = set(channel_dump["channel_name"])
-        nonexistent_channels = desired_channels - existing_channels
-        assert len(nonexistent_channels) == 0, (
-            "Some channels you're trying to add users to don't exist: "
-            + str(nonexistent_channels)
-        )
+    assert "emails" in user_dump, "User dump file doesn't have an email column"
+    user_dump["emails"] = user_dump["emails"].apply(
+        lambda x: x.split("|") if isinstance(x, str) else ""
+    )
 
-        users_with_channel_ids = user_to_channel.merge(
-            channel_dump, left_on="channel", right_on="channel_name"
-        )
-        #  We can't just join the two df on emails because it's possible for a user to have >1 email
-        users_with_channel_ids["user_id"] = users_with_channel_ids["email"].apply(
-            lambda x: find_user_id(x, user_dump)
-        )
+    # Users can have >1 email, so the join goes through an index of all of them
+    assignments = resolve_user_ids(user_to_channel, user_dump).merge(
+        channel_dump[["channel_id", "channel_name"]],
+        how="left",
+        left_on="channel",
+        right_on="channel_name",
+    )
+    missing_channel = assignments["channel_id"].isna() & assignments["error"].isna()
+    assignments.loc[missing_channel, "error"] = "Channel does not exist"
+    pending = assignments[assignments["error"].isna()]
+
+    if args.test:
+        for row in pending.itertuples():
+            print("Added user {} to channel {}".format(row.email, row.channel_name))
+            if args.set_owner:
+                print(
+                    "Set user {} as owner of channel {}".format(
+                        row.email, row.channel_name
+                    )
+                )
+    else:
+        # Channels are handled concurrently, the invites to one channel in order
+        channels = [rows for _channel_id, rows in pending.groupby("channel_id")]
+        with rocket_jobs.make_session(args.workers) as session:
+            rocket = RocketChat(
+                user_id=config["user_id"],
+                auth_token=config["auth_token"],
+                server_url=config["server"],
+                session=session,
+            )
+            limiter = rocket_jobs.RateLimiter()
+            results = rocket_jobs.run_jobs(
+                lambda rows: add_users_to_channel(
+                    rows, rocket, limiter, args.set_owner
+                ),
+                channels,
+                args.workers,
+                desc="Channels",
+            )
+        for rows, errors in zip(channels, results):
+            assignments.loc[rows.index, "error"] = errors
 
-        users_with_channel_ids.apply(
-            lambda x: add_user_to_channel(x, rocket, args.test), axis=1
+    failed = assignments[assignments["error"].notna()]
+    for row in failed.itertuples():
+        print('{} (email "{}", channel "{}")'.format(row.error, row.email, row.channel))
+    print(
+        "{} users added to channels, {} failed".format(
+            len(assignments) - len(failed), len(failed)
         )
-
-        if args.set_owner:
-            users_with_channel_ids.apply(
-                lambda x: set_user_as_owner(x, rocket, args.test), axis=1
-            )
+    )
+    if len(failed):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
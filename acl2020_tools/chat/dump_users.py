@@ -3,10 +3,11 @@ import json
 
 import pandas as pd
 import yaml
-from requests import sessions
 from rocketchat_API.rocketchat import RocketChat
 from tqdm.auto import tqdm
 
+import rocket_jobs  # type: ignore
+
 offset_delta = 100
 
 
@@ -26,6 +27,9 @@ def parse_arguments():
     )
 
     parser.add_argument("--add-roles", action="store_true", help="Get user roles")
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Pages of users fetched concurrently"
+    )
     return parser.parse_args()
 
 
@@ -40,27 +44,16 @@ def join_emails(emails):
     return delimiter.join(mails)
 
 
-def get_all_users(rocket, fields_string):
-    user_list = []
-    offset = 0
-    total = 99999999
-    while offset < total:
-        response = rocket.users_list(
-            fields=fields_string, offset=offset, count=offset_delta
-        )
-        if response.status_code != 200:
-            print("There was an error")
-            print(response.reason)
-            break
-
-        response = response.json()
-
-        total = response["total"]
-        user_list.extend(response["users"])
-        offset += response["count"]
-        print("Loaded {}/{}".format(offset, total))
-
-    return user_list
+def get_all_users(rocket, fields_string, workers=4):
+    """ Yields the users page by page """
+    return rocket_jobs.fetch_pages(
+        rocket.users_list,
+        "users",
+        page_size=offset_delta,
+        workers=workers,
+        desc="Users",
+        fields=fields_string,
+    )
 
 
 def get_rocketchat_fields(args):
@@ -69,15 +62,14 @@ def get_rocketchat_fields(args):
         "username": 1,
         "emails": 0 if args.no_email else 1,
         "utcOffset": 0 if args.no_timezone else 1,
-        "no_lastlogin": 0 if args.no_lastlogin else 1,
+        "lastLogin": 0 if args.no_lastlogin else 1,
     }
 
     return fields
 
 
 def add_roles(users, rocket):
-    print("Adding user roles")
-    for user in tqdm(users):
+    for user in tqdm(users, desc="Roles", leave=False):
         resp = rocket.users_info(user["_id"])
 
         if not resp.ok:
@@ -90,7 +82,7 @@ def add_roles(users, rocket):
 def main():
     args = parse_arguments()
     config = yaml.load(open(args.config))
-    with sessions.Session() as session:
+    with rocket_jobs.make_session(args.workers) as session:
         rocket = RocketChat(
             user_id=config["user_id"],
             auth_token=config["auth_token"],
@@ -103,22 +95,32 @@ def main():
         fields_string = json.dumps(fields)
 
         print(fields_string)
-        users = get_all_users(rocket, fields_string)
-
+        columns = ["_id"] + [field for field, value in fields.items() if value]
         if args.add_roles:
-            add_roles(users, rocket)
-
-        df = pd.DataFrame(users)
-
-        if "emails" in df:
-            df["email"] = df["emails"].apply(join_emails)
-        if "email" not in df and not args.no_email:
+            columns.append("roles")
+        seen = set()
+
+        # Each page is written as soon as it arrives
+        for i, users in enumerate(get_all_users(rocket, fields_string, args.workers)):
+            if args.add_roles:
+                add_roles(users, rocket)
+            seen.update(key for user in users for key in user)
+
+            df = pd.DataFrame(users, columns=columns)
+            if "emails" in df:
+                df["email"] = df["emails"].apply(join_emails)
+            df.to_csv(
+                "rocketchat-user-details.csv",
+                mode="a" if i else "w",
+                header=not i,
+                index=False,
+            )
+
+        if "emails" not in seen and not args.no_email:
             print("WARN: emails not retrieved; do you have permission?")
-        if "lastLogin" not in df and not args.no_lastlogin:
+        if "lastLogin" not in seen and not args.no_lastlogin:
             print("WARN: last login not retrieved; do you have permission?")
 
-        df.to_csv("rocketchat-user-details.csv", index=False)
-
 
 if __name__ == "__main__":
     main()
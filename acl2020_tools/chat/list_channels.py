@@ -1,13 +1,14 @@
 import argparse
 import json
-from typing import Any, Dict, List
+from typing import Any, Dict
 
 import pandas as pd
 import yaml
-from requests import sessions
 from rocketchat_API.rocketchat import RocketChat
 from tqdm import tqdm
 
+import rocket_jobs  # type: ignore
+
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description="MiniConf Portal Command Line")
@@ -43,9 +44,30 @@ def parse_arguments():
         action="store_true",
         help="Output only featured channels",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Pages of channels fetched concurrently. Default: 4",
+    )
     return parser.parse_args()
 
 
+# t: channel type (d: Direct chat, c: Chat, p: Private chat, l: Livechat)
+# msgs: number of messages
+fields = [
+    "name",
+    "msgs",
+    "usersCount",
+    "featured",
+    "t",
+    "topic",
+    "description",
+    "announcement",
+    "_updatedAt",
+]
+
+
 def postprocess(channels: pd.DataFrame) -> pd.DataFrame:
     if "t" in channels:
         channel_types = {
@@ -69,8 +91,8 @@ def postprocess(channels: pd.DataFrame) -> pd.DataFrame:
 def add_owners(channels: pd.DataFrame, rocket: RocketChat) -> pd.DataFrame:
     channels["owners"] = None
 
-    for idx, row in tqdm(channels.iterrows(), total=len(channels)):
-        if row.name:
+    for idx, row in tqdm(channels.iterrows(), total=len(channels), leave=False):
+        if row["name"]:
             ret = rocket.channels_roles(room_id=row["_id"])
             if ret.status_code == 200:
                 # Success! => add the owners
@@ -89,20 +111,6 @@ def add_owners(channels: pd.DataFrame, rocket: RocketChat) -> pd.DataFrame:
 
 
 def get_params(filter_featured: bool = False, regexp: str = None) -> Dict[str, str]:
-    # t: channel type (d: Direct chat, c: Chat, p: Private chat, l: Livechat)
-    # msgs: number of messages
-    fields = [
-        "name",
-        "msgs",
-        "usersCount",
-        "featured",
-        "t",
-        "topic",
-        "description",
-        "announcement",
-        "_updatedAt",
-    ]
-
     query: Dict[str, Any] = {}
     if filter_featured:
         query["featured"] = True
@@ -120,7 +128,7 @@ def main():
     args = parse_arguments()
     config = yaml.load(open(args.config), Loader=yaml.SafeLoader)
 
-    with sessions.Session() as session:
+    with rocket_jobs.make_session(args.workers) as session:
         rocket = RocketChat(
             user_id=config["user_id"],
             auth_token=config["auth_token"],
@@ -130,25 +138,25 @@ def main():
         channels_params = get_params(args.filter_featured, args.regexp)
 
         count = 50  # number of channels per page (default 50)
-        channels_list: List[Dict] = []
-        channels_json = rocket.channels_list(count=count, **channels_params).json()
-        channels_list.extend(channels_json["channels"])
-
-        total = channels_json["total"]
-        print(f"Found {total} channels")
-
-        for offset in tqdm(range(count, total, count)):
-            channels_json = rocket.channels_list(
-                offset=offset, count=count, **channels_params
-            ).json()
-            channels_list.extend(channels_json["channels"])
-
-        channels_df = postprocess(pd.DataFrame(channels_list))
+        pages = rocket_jobs.fetch_pages(
+            rocket.channels_list,
+            "channels",
+            page_size=count,
+            workers=args.workers,
+            desc="Channels",
+            **channels_params,
+        )
 
-        if args.add_owners:
-            print("Adding owners")
-            channels_df = add_owners(channels_df, rocket)
-        channels_df.to_csv(args.output_file, index=False)
+        # Each page is written as soon as it arrives
+        for i, channels_list in enumerate(pages):
+            channels_df = postprocess(
+                pd.DataFrame(channels_list, columns=["_id"] + fields)
+            )
+            if args.add_owners:
+                channels_df = add_owners(channels_df, rocket)
+            channels_df.to_csv(
+                args.output_file, mode="a" if i else "w", header=not i, index=False
+            )
 
 
 if __name__ == "__main__":
@@ -1,11 +1,13 @@
 import argparse
 import csv
 import json
+import sys
 
 import yaml
-from requests import sessions
 from rocketchat_API.rocketchat import RocketChat
 
+import rocket_jobs  # type: ignore
+
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description="MiniConf Portal Command Line")
@@ -13,6 +15,15 @@ def parse_arguments():
     parser.add_argument(
         "--papers", default="../sitedata_acl2020/papers.csv", help="Papers CSV"
     )
+    parser.add_argument(
+        "--workers", type=int, default=8, help="Concurrent requests to the server"
+    )
+    parser.add_argument(
+        "--sync",
+        metavar="CHANNELS_CSV",
+        help="Only create the missing rooms and update stale topics/descriptions, "
+        "comparing against this output of list_channels.py",
+    )
     parser.add_argument("--test", action="store_true")
     return parser.parse_args()
 
@@ -30,35 +41,125 @@ def read_papers(fname):
     return res
 
 
+def channel_name(paper):
+    return ("paper-" + paper["UID"]).replace(".", "-")
+
+
+def channel_topic(paper):
+    author_string = paper["authors"].replace("|", ", ")
+    return "%s - %s" % (paper["title"], author_string)
+
+
+def room_fields(paper):
+    return {"topic": channel_topic(paper), "description": paper["abstract"]}
+
+
+def read_channels(fname):
+    """ Channels by name from the output of list_channels.py """
+    with open(fname) as channels_file:
+        return {row["name"]: row for row in csv.DictReader(channels_file)}
+
+
+def plan_rooms(papers, channels=None):
+    """ (paper, channel id, fields to set) of the rooms to create or update:
+    all of them without a channel snapshot, otherwise the missing ones (with
+    no channel id) and the ones whose topic or description is stale """
+    jobs = []
+    for paper in papers:
+        fields = room_fields(paper)
+        if channels is None or channel_name(paper) not in channels:
+            jobs.append((paper, None, fields))
+            continue
+        channel = channels[channel_name(paper)]
+        stale = {
+            field: value
+            for field, value in fields.items()
+            if (channel.get(field) or "").strip() != value.strip()
+        }
+        if stale:
+            jobs.append((paper, channel["_id"], stale))
+    return jobs
+
+
+def set_fields(rocket, limiter, channel_id, fields):
+    setters = {
+        "topic": rocket.channels_set_topic,
+        "description": rocket.channels_set_description,
+    }
+    for field, value in fields.items():
+        error = rocket_jobs.api_error(limiter.call(setters[field], channel_id, value))
+        if error:
+            return error
+    return None
+
+
+def create_room(rocket, limiter, paper):
+    """ Creates the paper's channel, returning its id and None or the error """
+    name = channel_name(paper)
+    created, create_error = rocket_jobs.api_result(
+        limiter.call(rocket.channels_create, name)
+    )
+    if not create_error:
+        return created["channel"]["_id"], None
+    # Left over from an earlier run: only then look the channel up
+    info, info_error = rocket_jobs.api_result(
+        limiter.call(rocket.channels_info, channel=name)
+    )
+    if info_error:
+        return None, create_error
+    return info["channel"]["_id"], None
+
+
+def sync_room(rocket, limiter, job):
+    """ Runs a job of plan_rooms, returning None or the error """
+    paper, channel_id, fields = job
+    if channel_id is None:
+        channel_id, error = create_room(rocket, limiter, paper)
+        if error:
+            return error
+    return set_fields(rocket, limiter, channel_id, fields)
+
+
 if __name__ == "__main__":
     args = parse_arguments()
 
     config = yaml.load(open(args.config))
     papers = read_papers(args.papers)
 
-    with sessions.Session() as session:
+    channels = read_channels(args.sync) if args.sync else None
+    jobs = plan_rooms(papers, channels)
+    if channels is not None:
+        missing = sum(channel_id is None for _paper, channel_id, _fields in jobs)
+        print(
+            "%d rooms missing, %d stale, %d up to date"
+            % (missing, len(jobs) - missing, len(papers) - len(jobs))
+        )
+
+    if args.test:
+        for paper, channel_id, fields in jobs:
+            action = "Creating " if channel_id is None else "Updating "
+            print(action + channel_name(paper) + " " + ", ".join(fields))
+        sys.exit(0)
+
+    with rocket_jobs.make_session(args.workers) as session:
         rocket = RocketChat(
             user_id=config["user_id"],
             auth_token=config["auth_token"],
             server_url=config["server"],
             session=session,
         )
+        limiter = rocket_jobs.RateLimiter()
+        errors = rocket_jobs.run_jobs(
+            lambda job: sync_room(rocket, limiter, job),
+            jobs,
+            args.workers,
+            desc="Setting up rooms",
+        )
 
-        for paper in papers:
-            channel_name = "paper-" + paper["UID"]
-            channel_name = channel_name.replace(".", "-")
-            if not args.test:
-                created = rocket.channels_create(channel_name).json()
-                print(channel_name, created)
-
-            # Change to topic of papers.
-            author_string = paper["authors"].replace("|", ", ")
-            topic = "%s - %s" % (paper["title"], author_string,)
-            if not args.test:
-                channel_id = rocket.channels_info(channel=channel_name).json()[
-                    "channel"
-                ]["_id"]
-                rocket.channels_set_topic(channel_id, topic).json()
-                rocket.channels_set_description(channel_id, paper["abstract"]).json()
-
-            print("Creating " + channel_name + " topic " + topic)
+    for (paper, _channel_id, _fields), error in zip(jobs, errors):
+        if error:
+            print("Failed " + channel_name(paper) + ": " + str(error))
+    print(
+        "%d rooms set up, %d failed, %d throttled requests"
+        % (errors.count(None), len(errors) - errors.count(None), limiter.throttled)
+    )
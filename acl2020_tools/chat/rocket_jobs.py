@@ -0,0 +1,148 @@
+""" Run Rocket.Chat REST calls concurrently within the server's rate limits """
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Iterable, Iterator, List
+
+from requests import adapters, sessions
+from tqdm import tqdm
+
+
+class RateLimiter:
+    """ Shared by all workers: when the server reports that its rate-limit
+    window is used up (X-RateLimit-Remaining: 0, or a 429), every request waits
+    until X-RateLimit-Reset; 429s are retried with jittered backoff """
+
+    def __init__(self, max_attempts: int = 6, base_delay: float = 0.5):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.lock = threading.Lock()
+        self.resume_at = 0.0
+        self.throttled = 0
+
+    def wait(self):
+        with self.lock:
+            delay = self.resume_at - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+    def update(self, response):
+        headers = response.headers
+        if response.status_code != 429 and headers.get("X-RateLimit-Remaining") != "0":
+            return
+        if "X-RateLimit-Reset" in headers:
+            # Rocket.Chat gives the end of the window in epoch milliseconds
+            resume_at = int(headers["X-RateLimit-Reset"]) / 1000
+        elif "Retry-After" in headers:
+            resume_at = time.time() + float(headers["Retry-After"])
+        else:
+            return
+        with self.lock:
+            self.resume_at = max(self.resume_at, resume_at)
+
+    def call(self, func: Callable, *args, **kwargs):
+        """ Calls a RocketChat method, returning its response """
+        for attempt in range(self.max_attempts):
+            self.wait()
+            response = func(*args, **kwargs)
+            self.update(response)
+            if response.status_code != 429:
+                break
+            with self.lock:
+                self.throttled += 1
+            time.sleep(self.base_delay * 2**attempt * random.uniform(0.5, 1.5))
+        return response
+
+
+def api_result(response):
+    """ The JSON body of a RocketChat response and None when it succeeded,
+    otherwise the body (None if it isn't JSON) and the error """
+    status = "HTTP {}".format(response.status_code)
+    try:
+        ret = response.json()
+    except ValueError:
+        return None, status
+    if not isinstance(ret, dict):
+        return None, status
+    if ret.get("success"):
+        return ret, None
+    return ret, ret.get("error", status)
+
+
+def api_error(response):
+    """ None for a successful RocketChat response, otherwise the error """
+    return api_result(response)[1]
+
+
+def make_session(workers: int) -> sessions.Session:
+    """ A session whose connection pool fits the number of workers """
+    session = sessions.Session()
+    adapter = adapters.HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def run_jobs(
+    job: Callable[[Any], Any], items: Iterable, workers: int, desc: str = None
+) -> List[Any]:
+    """ Runs job(item) for every item on a bounded pool, with a progress bar,
+    returning the results in the order of the items """
+    items = list(items)
+    results: List[Any] = [None] * len(items)
+    with ThreadPoolExecutor(workers) as pool:
+        futures = {pool.submit(job, item): i for i, item in enumerate(items)}
+        for future in tqdm(as_completed(futures), total=len(items), desc=desc):
+            results[futures[future]] = future.result()
+    return results
+
+
+def fetch_pages(
+    method: Callable,
+    key: str,
+    page_size: int = 100,
+    workers: int = 4,
+    limiter: RateLimiter = None,
+    desc: str = None,
+    **params,
+) -> Iterator[List[dict]]:
+    """ Yields the pages of a paged listing (e.g. rocket.users_list with key
+    "users") in offset order; the first response gives the total, so the
+    other pages are then fetched with up to `workers` requests in flight """
+    limiter = limiter or RateLimiter()
+
+    def fetch(offset):
+        response = limiter.call(method, offset=offset, count=page_size, **params)
+        if response.status_code != 200:
+            print("There was an error fetching offset {}".format(offset))
+            print(response.reason)
+            return None
+        return response.json()
+
+    first = fetch(0)
+    if first is None:
+        return
+    total = first["total"]
+    yield first[key]
+    # The server may cap the page size below the one asked for
+    step = len(first[key])
+    if not step:
+        return
+    offsets = iter(range(step, total, step))
+    with tqdm(total=total, initial=step, desc=desc) as progress, ThreadPoolExecutor(
+        workers
+    ) as pool:
+        pending = deque(
+            pool.submit(fetch, offset) for offset in itertools.islice(offsets, workers)
+        )
+        while pending:
+            page = pending.popleft().result()
+            if page is None:
+                return
+            for offset in itertools.islice(offsets, 1):
+                pending.append(pool.submit(fetch, offset))
+            progress.update(len(page[key]))
+            yield page[key]
@@ -5,9 +5,10 @@ from collections import defaultdict
 from datetime import datetime, timedelta
 from typing import Any, DefaultDict, Dict
 
-import pandas as pd
 import yaml
 
+from acl2020_tools.utils.spreadsheet_cache import read_excel
+
 re_session_extract = re.compile(r"(\w+), (\w+) (\d+), (\d+) UTC(.*)")
 
 
@@ -35,7 +36,7 @@ def get_session_name(session_full_name: str, date: datetime) -> str:
 
 
 def main(demo_papers_xlsx: str, output_file: str, calendar_json: str):
-    demo_papers_df = pd.read_excel(demo_papers_xlsx)
+    demo_papers_df = read_excel(demo_papers_xlsx)
 
     session_time_map: DefaultDict[str, Dict[str, Any]] = defaultdict(
         lambda: {"date": "", "papers": []}
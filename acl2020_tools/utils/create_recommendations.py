@@ -0,0 +1,172 @@
+import argparse
+import csv
+import json
+import math
+from typing import List, Tuple
+
+import numpy as np
+
+from acl2020_tools.utils.embedding_store import load_embeddings
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    vectors = np.array(matrix, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def top_k(scores: np.ndarray, ids: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """ Selects the k best (id, score) pairs of each row, best first """
+    k = min(k, scores.shape[1])
+    best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    best_scores = np.take_along_axis(scores, best, axis=1)
+    order = np.argsort(-best_scores, axis=1, kind="stable")
+    return (
+        np.take_along_axis(np.take_along_axis(ids, best, axis=1), order, axis=1),
+        np.take_along_axis(best_scores, order, axis=1),
+    )
+
+
+def exact_neighbours(vectors: np.ndarray, k: int, block_size: int):
+    """ Top-k cosine neighbours of every row, one block of queries at a time """
+    n = len(vectors)
+    k = min(k, n - 1)
+    indices = np.zeros((n, k), dtype=np.int32)
+    scores = np.zeros(indices.shape, dtype=np.float32)
+    all_ids = np.arange(n, dtype=np.int32)
+    for start in range(0, n, block_size):
+        end = min(start + block_size, n)
+        sims = vectors[start:end] @ vectors.T
+        sims[np.arange(end - start), np.arange(start, end)] = -np.inf
+        ids = np.broadcast_to(all_ids, sims.shape)
+        indices[start:end], scores[start:end] = top_k(sims, ids, k)
+    return indices, scores
+
+
+def kmeans(vectors: np.ndarray, n_lists: int, iterations: int, seed: int):
+    """ Spherical k-means, used as the coarse quantizer of the IVF index """
+    rng = np.random.RandomState(seed)
+    n_lists = min(n_lists, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)]
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for c in range(n_lists):
+            members = vectors[assignment == c]
+            if len(members):
+                centroids[c] = members.sum(0)
+        centroids = normalize(centroids)
+    return centroids
+
+
+def ivf_neighbours(vectors: np.ndarray, k: int, n_lists: int, n_probe: int, seed=0):
+    """ Approximate top-k: each paper is only compared with the papers in the
+    n_probe inverted lists whose centroids are closest to it """
+    n = len(vectors)
+    k = min(k, n - 1)
+    n_lists = min(n_lists, n)
+    n_probe = min(n_probe, n_lists)
+    centroids = kmeans(vectors, n_lists, 10, seed)
+    centroid_sims = vectors @ centroids.T
+    assignment = np.argmax(centroid_sims, axis=1)
+    probes = np.argpartition(-centroid_sims, n_probe - 1, axis=1)[:, :n_probe]
+
+    indices = np.full((n, k), -1, dtype=np.int32)
+    scores = np.full((n, k), -np.inf, dtype=np.float32)
+    for c in range(n_lists):
+        members = np.flatnonzero(assignment == c).astype(np.int32)
+        queries = np.flatnonzero((probes == c).any(axis=1))
+        if not len(members) or not len(queries):
+            continue
+        sims = vectors[queries] @ vectors[members].T
+        sims[queries[:, None] == members[None, :]] = -np.inf
+        ids = np.broadcast_to(members, sims.shape)
+        indices[queries], scores[queries] = top_k(
+            np.hstack([scores[queries], sims]),
+            np.hstack([indices[queries], ids]),
+            k,
+        )
+    return indices, scores
+
+
+def read_uids(papers_csv: str) -> List[str]:
+    with open(papers_csv, "r") as fd:
+        return [row["UID"] for row in csv.DictReader(fd)]
+
+
+def save_recommendations(out_file: str, uids: List[str], indices, scores):
+    if out_file.endswith(".npz"):
+        np.savez_compressed(
+            out_file,
+            uids=np.array(uids),
+            neighbours=indices,
+            scores=scores.astype(np.float16),
+        )
+    else:
+        recs = {
+            uid: [uids[i] for i in neighbours if i >= 0]
+            for uid, neighbours in zip(uids, indices)
+        }
+        with open(out_file, "w") as fd:
+            json.dump(recs, fd)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Compute similar paper recommendations from abstract embeddings"
+    )
+    parser.add_argument(
+        "--embeddings", type=str, help="embeddings.npy or embeddings.torch"
+    )
+    parser.add_argument(
+        "--papers",
+        type=str,
+        help="papers.csv the embeddings were computed from "
+        "(not needed when the embeddings have a UID index)",
+    )
+    parser.add_argument(
+        "--out",
+        type=str,
+        default="paper_recs.json",
+        help="paper_recs.json (neighbour UIDs) or .npz (UIDs, neighbours, scores)",
+    )
+    parser.add_argument("-k", "--top-k", type=int, default=10)
+    parser.add_argument(
+        "--block-size",
+        type=int,
+        default=1024,
+        help="Number of papers scored per matrix multiplication",
+    )
+    parser.add_argument(
+        "--approximate",
+        action="store_true",
+        help="Use an IVF index instead of comparing all pairs of papers",
+    )
+    parser.add_argument(
+        "--n-lists", type=int, default=0, help="IVF lists (default: sqrt(papers))"
+    )
+    parser.add_argument(
+        "--n-probe", type=int, default=4, help="IVF lists searched per paper"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    matrix, uids = load_embeddings(args.embeddings)
+    if uids is None:
+        uids = read_uids(args.papers)
+    assert len(uids) == len(matrix), "Papers and embeddings have different lengths"
+
+    vectors = normalize(matrix)
+    if args.approximate:
+        n_lists = args.n_lists or max(1, int(math.sqrt(len(vectors))))
+        n_probe = min(args.n_probe, n_lists)
+        indices, scores = ivf_neighbours(vectors, args.top_k, n_lists, n_probe)
+    else:
+        indices, scores = exact_neighbours(vectors, args.top_k, args.block_size)
+    save_recommendations(args.out, uids, indices, scores)
+
+
+if __name__ == "__main__":
+    main()
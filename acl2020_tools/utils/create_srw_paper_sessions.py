@@ -4,9 +4,10 @@ from collections import defaultdict
 from datetime import datetime
 from typing import Any, DefaultDict, Dict
 
-import pandas as pd
 import yaml
 
+from acl2020_tools.utils.spreadsheet_cache import read_excel
+
 re_session_extract = re.compile(
     r"\w+ (\w+) (\d+), (\d+) SRW Session (\d+\w) (\d+):(\d\d) UTC(.*)"
 )
@@ -23,9 +24,7 @@ def extract_date(x):
 
 
 def main(srw_papers_xlsx: str, output_file: str):
-    srw_papers_df = pd.read_excel(
-        srw_papers_xlsx, na_values=None, keep_default_na=False
-    )
+    srw_papers_df = read_excel(srw_papers_xlsx, na_values=None, keep_default_na=False)
 
     session_time_map: DefaultDict[str, Dict[str, Any]] = defaultdict(
         lambda: {"date": "", "papers": []}
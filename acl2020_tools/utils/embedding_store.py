@@ -0,0 +1,42 @@
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def uids_path(matrix_path: str) -> str:
+    """ Sidecar file listing the UID of each matrix row, one per line """
+    return os.path.splitext(matrix_path)[0] + ".uids.txt"
+
+
+def save_matrix(path: str, embeddings: np.ndarray, uids: List[str], dtype="float32"):
+    """ Writes a raw .npy matrix that can be memory-mapped without torch """
+    np.save(path, np.ascontiguousarray(embeddings, dtype=dtype))
+    with open(uids_path(path), "w") as f:
+        f.writelines(uid + "\n" for uid in uids)
+
+
+def load_embeddings(path: str) -> Tuple[np.ndarray, Optional[List[str]]]:
+    """ Loads an embedding matrix (.npy or .torch) and its UID index if present """
+    if path.endswith(".npy"):
+        matrix = np.load(path, mmap_mode="r")
+    else:
+        import torch  # pylint: disable=import-outside-toplevel
+
+        matrix = torch.load(path).numpy()
+
+    uids = None
+    if os.path.exists(uids_path(path)):
+        with open(uids_path(path)) as f:
+            uids = [line.rstrip("\n") for line in f]
+        assert len(uids) == len(matrix), "UID index does not match the matrix"
+    return matrix, uids
+
+
+def matrix_rows(paper_uids: List[str], uids: Optional[List[str]]) -> List[int]:
+    """ The matrix row of each paper, through the UID index when there is one
+    and otherwise by position """
+    if uids is None:
+        return list(range(len(paper_uids)))
+    rows = {uid: i for i, uid in enumerate(uids)}
+    return [rows[uid] for uid in paper_uids]
@@ -1,32 +1,244 @@
 import argparse
 import csv
+import hashlib
+import multiprocessing
+import os
+import time
+from typing import Dict, List
 
 import torch
 import transformers
 
+from acl2020_tools.utils.embedding_store import save_matrix
+
+MODEL_NAME = "deepset/sentence_bert"
+MAX_LENGTH = 512
+
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description="MiniConf Portal Command Line")
 
     parser.add_argument("papers", default=False, help="papers file to parse")
+    parser.add_argument(
+        "--model", default=MODEL_NAME, help="transformers model of the embeddings"
+    )
+    parser.add_argument(
+        "--batch-size",
+        default=32,
+        type=int,
+        help="Number of abstracts padded into a single forward pass",
+    )
+    parser.add_argument(
+        "--cache",
+        default="embeddings_cache.torch",
+        help="Embedding store keyed by model and abstract hash",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Re-encode every abstract"
+    )
+    parser.add_argument(
+        "--workers",
+        default=1,
+        type=int,
+        help="Number of processes encoding contiguous shards of the batches",
+    )
+    parser.add_argument(
+        "--threads",
+        default=0,
+        type=int,
+        help="torch intra-op threads per process (default: cores / workers)",
+    )
+    parser.add_argument(
+        "--npy",
+        action="store_true",
+        help="Also write a memory-mappable embeddings.npy with a UID index",
+    )
+    parser.add_argument(
+        "--float16", action="store_true", help="Store embeddings.npy as float16"
+    )
     return parser.parse_args()
 
 
-if __name__ == "__main__":
-    args = parse_arguments()
-    tokenizer = transformers.AutoTokenizer.from_pretrained("deepset/sentence_bert")
+def abstract_key(model_name: str, abstract: str) -> str:
+    """ Content hash of an abstract, ignoring whitespace differences """
+    text = model_name + "\n" + " ".join(abstract.split())
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_cache(path: str) -> Dict[str, torch.Tensor]:
+    if not os.path.exists(path):
+        return {}
+    store = torch.load(path)
+    return dict(zip(store["keys"], store["embeddings"]))
+
+
+def save_cache(path: str, cache: Dict[str, torch.Tensor]):
+    keys = sorted(cache)
+    store = {"keys": keys, "embeddings": torch.stack([cache[k] for k in keys])}
+    torch.save(store, path)
+
+
+def tokenize_abstracts(tokenizer, abstracts: List[str]) -> List[List[int]]:
+    """ Encodes each abstract, truncating to the model's maximum length """
+    return [
+        tokenizer.encode(abstract, truncation=True, max_length=MAX_LENGTH)
+        for abstract in abstracts
+    ]
+
 
-    model = transformers.AutoModel.from_pretrained("deepset/sentence_bert")
+def make_batches(token_ids: List[List[int]], batch_size: int) -> List[List[int]]:
+    """ Groups row indices into batches of abstracts with similar lengths """
+    order = sorted(range(len(token_ids)), key=lambda i: (len(token_ids[i]), i))
+    return [order[i : i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+def embed_batch(model, batch: List[List[int]], pad_token_id: int) -> torch.Tensor:
+    """ Mean-pools the last hidden states over the non-padding tokens """
+    max_len = max(len(ids) for ids in batch)
+    input_ids = torch.full((len(batch), max_len), pad_token_id, dtype=torch.long)
+    attention_mask = torch.zeros(len(batch), max_len, dtype=torch.long)
+    for i, ids in enumerate(batch):
+        input_ids[i, : len(ids)] = torch.tensor(ids, dtype=torch.long)
+        attention_mask[i, : len(ids)] = 1
+
+    hidden_states = model(input_ids, attention_mask=attention_mask)[0]
+    mask = attention_mask.unsqueeze(-1).to(hidden_states.dtype)
+    return (hidden_states * mask).sum(1) / mask.sum(1)
+
+
+def embed_batches(model, batches: List[List[List[int]]], pad_token_id: int):
+    with torch.no_grad():
+        return [embed_batch(model, batch, pad_token_id) for batch in batches]
+
+
+def split_shards(batches: List[List[List[int]]], workers: int):
+    """ Splits the batches into contiguous shards of roughly equal token count """
+    costs = [len(batch) * max(len(ids) for ids in batch) for batch in batches]
+    target = sum(costs) / workers
+    shards: List[List[List[List[int]]]] = [[]]
+    total = 0
+    for batch, cost in zip(batches, costs):
+        if total >= target * len(shards) and len(shards) < workers:
+            shards.append([])
+        shards[-1].append(batch)
+        total += cost
+    return shards
+
+
+def load_model(model_name: str = MODEL_NAME):
+    model = transformers.AutoModel.from_pretrained(model_name)
     model.eval()
+    return model
+
+
+worker_model = None
+
+
+def init_worker(threads: int, model_name: str):
+    global worker_model  # pylint: disable=global-statement
+    torch.set_num_threads(threads)
+    worker_model = load_model(model_name)
+
+
+def embed_shard(shard_args):
+    shard, pad_token_id = shard_args
+    return embed_batches(worker_model, shard, pad_token_id)
+
+
+def embed_sharded(
+    batches, pad_token_id: int, workers: int, threads: int, model_name: str
+):
+    shards = split_shards(batches, workers)
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(len(shards), init_worker, (threads, model_name)) as pool:
+        results = pool.map(embed_shard, [(shard, pad_token_id) for shard in shards])
+    return [embedding for shard in results for embedding in shard]
+
+
+def embed_token_ids(
+    token_ids: List[List[int]],
+    batch_size: int,
+    workers: int,
+    threads: int,
+    pad_token_id: int,
+    model_name: str = MODEL_NAME,
+) -> torch.Tensor:
+    """ Embeds the encoded abstracts, returning one row per abstract """
+    # The batch plan does not depend on --workers, so every abstract is padded
+    # with the same neighbours. The results still only match a single process
+    # up to float rounding: the intra-op thread count (threads) differs, and
+    # with it the order of the reductions.
+    plan = make_batches(token_ids, batch_size)
+    batches = [[token_ids[i] for i in batch] for batch in plan]
+    if workers > 1 and len(batches) > 1:
+        results = embed_sharded(batches, pad_token_id, workers, threads, model_name)
+    else:
+        torch.set_num_threads(threads)
+        results = embed_batches(load_model(model_name), batches, pad_token_id)
+
+    embeddings = torch.zeros(len(token_ids), results[0].shape[1])
+    for batch, result in zip(plan, results):
+        embeddings[batch] = result
+    return embeddings
+
+
+def encode_missing(abstracts: Dict[str, str], args):
+    """ Embeds the given {key: abstract} mapping """
+    tokenizer = transformers.AutoTokenizer.from_pretrained(args.model)
+    threads = args.threads or max(1, (os.cpu_count() or 1) // args.workers)
+
+    keys = list(abstracts)
+    start = time.perf_counter()
+    token_ids = tokenize_abstracts(tokenizer, [abstracts[k] for k in keys])
+    embeddings = embed_token_ids(
+        token_ids,
+        args.batch_size,
+        args.workers,
+        threads,
+        tokenizer.pad_token_id,
+        args.model,
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        "Embedded {} abstracts in {:.1f}s ({:.1f} abstracts/s)".format(
+            len(keys), elapsed, len(keys) / max(elapsed, 1e-9)
+        )
+    )
+    return dict(zip(keys, embeddings))
+
+
+def main():
+    args = parse_arguments()
 
     with open(args.papers, "r") as f:
-        abstracts = list(csv.DictReader(f))
-        all_abstracts = torch.zeros(len(abstracts), 768)
-        with torch.no_grad():
-            for i, row in enumerate(abstracts):
-
-                input_ids = torch.tensor([tokenizer.encode(row["abstract"])][:512])
-                all_hidden_states, _ = model(input_ids)[-2:]
-                all_abstracts[i] = all_hidden_states.mean(0).mean(0)
-                print(i)
+        papers = list(csv.DictReader(f))
+    keys = [abstract_key(args.model, paper["abstract"]) for paper in papers]
+
+    cache = {} if args.no_cache else load_cache(args.cache)
+    missing = {
+        key: paper["abstract"] for key, paper in zip(keys, papers) if key not in cache
+    }
+    print(
+        "{}/{} abstracts found in the embedding cache".format(
+            sum(key in cache for key in keys), len(papers)
+        )
+    )
+
+    if missing:
+        cache.update(encode_missing(missing, args))
+        if not args.no_cache:
+            save_cache(args.cache, cache)
+
+    all_abstracts = torch.stack([cache[key] for key in keys])
     torch.save(all_abstracts, "embeddings.torch")
+    if args.npy:
+        save_matrix(
+            "embeddings.npy",
+            all_abstracts.numpy(),
+            [paper["UID"] for paper in papers],
+            "float16" if args.float16 else "float32",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Produce the per-venue paper CSVs and the merged papers.csv in one run.
+
+Every source spreadsheet is read exactly once, concurrently in a process pool
+(pd.read_excel dominates the run time), and the Q&A schedule is shared by the
+CL and TACL transforms. Venues whose input files are not given are skipped.
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+import pandas as pd
+
+from acl2020_tools.utils.merge_paper_csvs import merge_paper_csvs
+from acl2020_tools.utils.paper_import import (
+    add_clean_cache_argument,
+    cleaning_cache,
+    format_papers,
+    write_papers_csv,
+)
+from acl2020_tools.utils.process_cl_papers import format_cl_papers
+from acl2020_tools.utils.process_demo_papers import demo_colnames, format_demo_papers
+from acl2020_tools.utils.process_srw_papers import format_srw_papers, read_srw_papers
+from acl2020_tools.utils.process_tacl_papers import format_tacl_papers
+from acl2020_tools.utils.spreadsheet_cache import read_excel
+
+
+def source_readers(args):
+    """ Maps each source name to the reader call loading it """
+    return {
+        "accepted_papers": (pd.read_csv, args.accepted_papers_file),
+        "tracks": (read_excel, args.track_file),
+        "cl_papers": (read_excel, args.cl_xlsx_file),
+        "tacl_papers": (read_excel, args.tacl_xlsx_file),
+        "qa_slots": (read_excel, args.qa_session_xlsx, 1),
+        "srw_papers": (read_srw_papers, args.srw_papers_file),
+        "srw_ids": (read_excel, args.srw_ids_file),
+        "demo_papers": (read_excel, args.demo_papers_file),
+        "demo_ids": (read_excel, args.demo_ids_file),
+    }
+
+
+def venues(args):
+    """ (output file, sources, transform, writer) of each venue, in merge order """
+    return [
+        (
+            "main_papers.csv",
+            ["accepted_papers", "tracks"],
+            lambda papers, tracks: format_papers(papers, tracks, args.volume),
+            lambda df, out: df.to_csv(out, index=False),
+        ),
+        (
+            "cl_papers.csv",
+            ["cl_papers", "qa_slots"],
+            format_cl_papers,
+            write_papers_csv,
+        ),
+        (
+            "tacl_papers.csv",
+            ["tacl_papers", "qa_slots"],
+            format_tacl_papers,
+            write_papers_csv,
+        ),
+        (
+            "srw_papers.csv",
+            ["srw_papers", "srw_ids"],
+            format_srw_papers,
+            write_papers_csv,
+        ),
+        (
+            "demo_papers.csv",
+            ["demo_papers", "demo_ids"],
+            format_demo_papers,
+            lambda df, out: write_papers_csv(df, out, demo_colnames),
+        ),
+    ]
+
+
+def read_sources(readers, names: List[str], workers: int) -> Dict[str, pd.DataFrame]:
+    with ProcessPoolExecutor(workers or None) as pool:
+        futures = {
+            name: pool.submit(readers[name][0], *readers[name][1:]) for name in names
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+
+def import_papers(args):
+    readers = source_readers(args)
+    selected = [
+        venue
+        for venue in venues(args)
+        if all(readers[source][1] for source in venue[1])
+    ]
+    needed = sorted({source for _, sources, _, _ in selected for source in sources})
+    print("Reading {}".format(", ".join(readers[name][1] for name in needed)))
+    sources = read_sources(readers, needed, args.workers)
+
+    outputs = []
+    for output_file, source_names, transform, write in selected:
+        output_file = os.path.join(args.output_dir, output_file)
+        papers_df = transform(*[sources[name] for name in source_names])
+        write(papers_df, output_file)
+        print("Wrote {} papers to {}".format(len(papers_df), output_file))
+        outputs.append(output_file)
+
+    merged_file = os.path.join(args.output_dir, "papers.csv")
+    merge_paper_csvs(merged_file, outputs)
+    print("Merged {} into {}".format(", ".join(outputs), merged_file))
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--volume",
+        help="Volume in the ACL Anthology that the main papers are part of",
+    )
+    parser.add_argument(
+        "--accepted-papers-file",
+        help="CSV of paper title, authors, abstract, and submission type",
+    )
+    parser.add_argument(
+        "--track-file",
+        help="Excel spreadsheet giving each paper's track and ID in the proceedings",
+    )
+    parser.add_argument("--cl-xlsx-file", help="ACL2020.CL.papers.xlsx")
+    parser.add_argument("--tacl-xlsx-file", help="ACL2020.TACL.papers.xlsx")
+    parser.add_argument(
+        "--qa-session-xlsx",
+        help="ACL 2020 live Q&A schedule (for authors).xlsx file to extract slots",
+    )
+    parser.add_argument("--srw-papers-file", help="old srw_papers.csv without pdf_url")
+    parser.add_argument("--srw-ids-file", help="srw-ids.xlsx")
+    parser.add_argument(
+        "--demo-papers-file", help="DemoPapers_SHARED.xlsx from demo chairs"
+    )
+    parser.add_argument("--demo-ids-file", help="demo-ids.xlsx")
+    parser.add_argument(
+        "--output-dir", default=".", help="Directory for the paper CSV files"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Processes reading the spreadsheets (default: number of cores)",
+    )
+    add_clean_cache_argument(parser)
+    args = parser.parse_args()
+    if args.accepted_papers_file and args.track_file and not args.volume:
+        parser.error("--volume is required to import the main papers")
+    return args
+
+
+def main():
+    args = parse_arguments()
+    with cleaning_cache(args.clean_cache):
+        import_papers(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,20 @@
 import argparse
 import csv
+import os
+
+common_keys = [
+    "UID",
+    "title",
+    "authors",
+    "abstract",
+    "keywords",
+    "track",
+    "paper_type",
+    "pdf_url",
+]
+# Without these a row can't be shown on the site; the other common keys are
+# written as empty strings when an input doesn't have them
+required_keys = ["UID", "title", "authors", "abstract"]
 
 
 def parse_args():
@@ -14,26 +29,44 @@ def parse_args():
     return parser.parse_args()
 
 
-def merge_paper_csvs(out_file, csvs):
-    data = []
+def read_papers(csvs):
+    """ Yields the rows of every input in order, checking the schema and that
+    UIDs are unique as they go """
+    seen_uids = set()
     for fname in csvs:
         with open(fname, "r") as fd:
-            data = data + list(csv.DictReader(fd))
-    common_keys = [
-        "UID",
-        "title",
-        "authors",
-        "abstract",
-        "keywords",
-        "track",
-        "paper_type",
-        "pdf_url",
-    ]
-    data = [{k: v for k, v in paper.items() if k in common_keys} for paper in data]
-    with open(out_file, "w") as fd:
-        dict_writer = csv.DictWriter(fd, common_keys)
-        dict_writer.writeheader()
-        dict_writer.writerows(data)
+            reader = csv.DictReader(fd)
+            columns = reader.fieldnames or []
+            missing = [k for k in required_keys if k not in columns]
+            if missing:
+                raise ValueError("{} has no {} column(s)".format(fname, missing))
+            optional = [k for k in common_keys if k not in columns]
+            if optional:
+                print("{}: no {} column(s); leaving them empty".format(fname, optional))
+
+            for paper in reader:
+                uid = paper["UID"]
+                if uid in seen_uids:
+                    raise ValueError(
+                        "{}:{}: duplicate UID {}".format(fname, reader.line_num, uid)
+                    )
+                seen_uids.add(uid)
+                yield paper
+
+
+def merge_paper_csvs(out_file, csvs):
+    """ The output only replaces out_file once every row has been checked, so
+    a failed merge leaves the previous file in place """
+    tmp_file = out_file + ".tmp"
+    try:
+        with open(tmp_file, "w") as fd:
+            dict_writer = csv.DictWriter(fd, common_keys, extrasaction="ignore")
+            dict_writer.writeheader()
+            dict_writer.writerows(read_papers(csvs))
+        os.replace(tmp_file, out_file)
+    except BaseException:
+        os.remove(tmp_file)
+        raise
 
 
 if __name__ == "__main__":
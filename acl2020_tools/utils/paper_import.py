@@ -1,8 +1,19 @@
 import argparse
+import contextlib
+import csv
+import functools
+import hashlib
+import json
+import os
 import re
+from collections import OrderedDict
 
 import pandas as pd
 
+from acl2020_tools.utils.spreadsheet_cache import read_excel
+
+CACHE_SIZE = 1 << 16
+
 re_author_split = re.compile(" and |, ")
 re_curly_brace = re.compile("{([A-Za-z0-9 ]+)}")
 
@@ -39,6 +50,7 @@ direct_replacements = {
     "\\Leftrightarrow": "⇔",
     "\\Leftarrow": "⇐",
 }
+re_direct_replacements = re.compile("|".join(map(re.escape, direct_replacements)))
 
 subscript_map = {
     "0": "₀",
@@ -74,30 +86,101 @@ def convert_subscript_match(match):
     return "".join([subscript_map[char] for char in str(match.group(1))])
 
 
+# Applied in this order, each one only to text containing one of its literals
+latex_stages = [
+    (re_superscript, convert_superscript_match, ("\\textsuperscript{",)),
+    (re_subscript, convert_subscript_match, ("\\textsubscript{",)),
+    (re_textsc, r"\1", ("\\textsc{",)),
+    (re_inline_sc, r"\1", ("{\\sc ",)),
+    (re_textrm, r"\1", ("\\textrm{",)),
+    (re_textbf, r"\1", ("\\textbf{",)),
+    (re_inline_bf, r"\1", ("{\\bf ",)),
+    (re_cite, " ", ("\\cite",)),
+    (re_url, r"\1", ("\\url{",)),
+    (re_footnote, r" (\1)", ("\\footnote{",)),
+    (re_mathmode, r"\1", ("$",)),
+    (re_inline_italics, r"\1", ("{\\em ", "{\\it ")),
+    (re_italics, r"\1", ("\\emph{", "\\textit{")),
+]
+
+
+def convert_direct_match(match):
+    return direct_replacements[match.group(0)]
+
+
+def replace_direct(text):
+    return re_direct_replacements.sub(convert_direct_match, text)
+
+
+def collapse_whitespace(text):
+    """ Same as re_multi_space.sub(" ", text) """
+    collapsed = " ".join(text.split())
+    if not collapsed:
+        return " " if text else text
+    if text[0].isspace():
+        collapsed = " " + collapsed
+    if text[-1].isspace():
+        collapsed = collapsed + " "
+    return collapsed
+
+
+def contains_any(text, literals):
+    return isinstance(text, str) and any(literal in text for literal in literals)
+
+
+class CleaningCache:
+    """ Bounded LRU memo for a single-argument cleaning function """
+
+    def __init__(self, func, maxsize=CACHE_SIZE):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.maxsize = maxsize
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, text):
+        return self.get(text, self.func)
+
+    def __contains__(self, text):
+        return text in self.entries
+
+    def get(self, text, compute):
+        try:
+            value = self.entries[text]
+        except KeyError:
+            self.misses += 1
+            value = compute(text)
+            self.entries[text] = value
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        else:
+            self.hits += 1
+            self.entries.move_to_end(text)
+        return value
+
+
+@CleaningCache
 def clean_abstract(abstract):
-    for source, dest in direct_replacements.items():
-        abstract = abstract.replace(source, dest)
-    abstract = re_newline.sub(" ", abstract)
-    abstract = re_superscript.sub(convert_superscript_match, abstract)
-    abstract = re_subscript.sub(convert_subscript_match, abstract)
-    abstract = re_textsc.sub(r"\1", abstract)
-    abstract = re_inline_sc.sub(r"\1", abstract)
-    abstract = re_textrm.sub(r"\1", abstract)
-    abstract = re_textbf.sub(r"\1", abstract)
-    abstract = re_inline_bf.sub(r"\1", abstract)
-    abstract = re_cite.sub(" ", abstract)
-    abstract = re_url.sub(r"\1", abstract)
-    abstract = re_footnote.sub(r" (\1)", abstract)
-    abstract = re_mathmode.sub(r"\1", abstract)
-    abstract = re_inline_italics.sub(r"\1", abstract)
-    abstract = re_italics.sub(r"\1", abstract)
-    abstract = re_multi_space.sub(" ", abstract)
-    return abstract
+    if "\\" in abstract:
+        abstract = replace_direct(abstract)
+    if "\n" in abstract:
+        abstract = re_newline.sub(" ", abstract)
+    if "\\" in abstract or "$" in abstract:
+        for pattern, replacement, literals in latex_stages:
+            if contains_any(abstract, literals):
+                abstract = pattern.sub(replacement, abstract)
+    return collapse_whitespace(abstract)
+
+
+def clean_abstracts(abstracts: pd.Series) -> pd.Series:
+    """ clean_abstract over a whole Series, skipping missing values """
+    return abstracts.map(clean_abstract, na_action="ignore")
 
 
+@CleaningCache
 def clean_title(paper_title):
-    for source, dest in direct_replacements.items():
-        paper_title = paper_title.replace(source, dest)
+    paper_title = replace_direct(paper_title)
     paper_title = re_curly_brace.sub(r"\1", paper_title)
     return paper_title
 
@@ -106,8 +189,86 @@ def miniconf_join_list(lst):
     return "|".join(lst)
 
 
+def write_papers_csv(papers_df: pd.DataFrame, output_file: str, columns=None):
+    papers_df.to_csv(
+        output_file,
+        sep=",",
+        index=False,
+        encoding="utf-8",
+        quoting=csv.QUOTE_ALL,
+        columns=columns,
+    )
+
+
+@CleaningCache
 def parse_authors(author_string):
-    return re_author_split.split(author_string)
+    # A tuple, so that callers can't modify the cached value
+    return tuple(re_author_split.split(author_string))
+
+
+cleaning_caches = {
+    "clean_abstract": clean_abstract,
+    "clean_title": clean_title,
+    "parse_authors": parse_authors,
+}
+
+
+def cleaning_code_version():
+    """ Persisted results are only valid for the cleaning code that produced them """
+    with open(__file__, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_cleaning_cache(path):
+    if not path or not os.path.exists(path):
+        return
+    with open(path) as f:
+        data = json.load(f)
+    if data.get("version") != cleaning_code_version():
+        print("Cleaning cache {} is outdated; ignoring it".format(path))
+        return
+    for name, cache in cleaning_caches.items():
+        for text, value in data["caches"].get(name, {}).items():
+            cache.entries[text] = tuple(value) if isinstance(value, list) else value
+        while len(cache.entries) > cache.maxsize:
+            cache.entries.popitem(last=False)
+
+
+def save_cleaning_cache(path):
+    if not path:
+        return
+    caches = {
+        name: {k: v for k, v in cache.entries.items() if isinstance(k, str)}
+        for name, cache in cleaning_caches.items()
+    }
+    with open(path, "w") as f:
+        json.dump({"version": cleaning_code_version(), "caches": caches}, f)
+
+
+def print_cleaning_cache_stats():
+    for name, cache in cleaning_caches.items():
+        print(
+            "{}: {} hits, {} misses, {} cached".format(
+                name, cache.hits, cache.misses, len(cache.entries)
+            )
+        )
+
+
+def add_clean_cache_argument(parser):
+    parser.add_argument(
+        "--clean-cache",
+        help="JSON file keeping cleaned titles/abstracts/authors between runs",
+    )
+
+
+@contextlib.contextmanager
+def cleaning_cache(path):
+    """ Loads the cleaning cache from path, and saves it and prints its hit
+    rates once the block has run """
+    load_cleaning_cache(path)
+    yield
+    save_cleaning_cache(path)
+    print_cleaning_cache_stats()
 
 
 def extract_slot(qa_session_info):
@@ -158,24 +319,21 @@ def parse_arguments():
         type=str,
         default="paper_tracks.xls",
     )
+    add_clean_cache_argument(parser)
     return parser.parse_args()
 
 
-def main():
-    args = parse_arguments()
-    papers = pd.read_csv(args.accepted_papers_file)
-    track_details = pd.read_excel(args.track_file)
-
+def format_papers(papers, track_details, volume):
     assert set(papers["Submission ID"].values) == set(track_details["ID"].values)
     papers = papers.merge(right=track_details, left_on="Submission ID", right_on="ID")
 
-    acl_id_stub = str(args.volume) + "."
+    acl_id_stub = str(volume) + "."
     acl_url_stub = "https://www.aclweb.org/anthology/2020.acl-"
 
     papers["authors"] = papers["Authors"].apply(
         lambda x: miniconf_join_list(parse_authors(x))
     )
-    papers["Abstract"] = papers["Abstract"].apply(clean_abstract)
+    papers["Abstract"] = clean_abstracts(papers["Abstract"])
     papers["title"] = papers["title"].apply(clean_title)
     papers["UID"] = papers["Line order"].apply(lambda x: acl_id_stub + str(x))
     papers["pdf_url"] = papers["UID"].apply(lambda x: acl_url_stub + x + ".pdf")
@@ -204,7 +362,17 @@ def main():
     ]
     papers.sort_values(by="Line order", axis=0, inplace=True)
     papers.drop(columns="Line order", inplace=True)
-    papers.to_csv("papers.csv", index=False)
+    return papers
+
+
+def main():
+    args = parse_arguments()
+    with cleaning_cache(args.clean_cache):
+        papers = pd.read_csv(args.accepted_papers_file)
+        track_details = read_excel(args.track_file)
+
+        papers = format_papers(papers, track_details, args.volume)
+        papers.to_csv("papers.csv", index=False)
 
 
 if __name__ == "__main__":
@@ -1,23 +1,27 @@
 import argparse
-import csv
 
 import pandas as pd
 
-from acl2020_tools.utils.paper_import import clean_abstract, clean_title, extract_slot
+from acl2020_tools.utils.paper_import import (
+    add_clean_cache_argument,
+    clean_abstracts,
+    clean_title,
+    cleaning_cache,
+    extract_slot,
+    write_papers_csv,
+)
+from acl2020_tools.utils.spreadsheet_cache import read_excel
 
 
 def format_author_names(csv_authors):
     return "|".join(x.strip() for x in csv_authors.split(","))
 
 
-def process_cl_papers(cl_xlsx: str, slot_xlsx: str, output_file: str):
-    raw_df = pd.read_excel(cl_xlsx)
-
-    slots_df = pd.read_excel(slot_xlsx, 1)
+def format_cl_papers(raw_df: pd.DataFrame, slots_df: pd.DataFrame) -> pd.DataFrame:
     cl_slots = slots_df.loc[
         slots_df["paper pub venue"].apply(lambda x: x.strip().lower())
         == "computational linguistics"
-    ]
+    ].copy()
     cl_slots["Submission ID"] = cl_slots["ID"].apply(lambda x: int(str(x)[1:])).copy()
     concatenated_df = pd.merge(raw_df, cl_slots, on="Submission ID")
 
@@ -28,14 +32,17 @@ def process_cl_papers(cl_xlsx: str, slot_xlsx: str, output_file: str):
 
     cl_clean_df["title"] = concatenated_df["Title_x"].apply(clean_title)
     cl_clean_df["authors"] = concatenated_df["Authors_x"].apply(format_author_names)
-    cl_clean_df["abstract"] = concatenated_df["Abstract"].apply(clean_abstract)
+    cl_clean_df["abstract"] = clean_abstracts(concatenated_df["Abstract"])
     cl_clean_df["paper_track"] = concatenated_df["slot 1"].apply(extract_slot)
     cl_clean_df["paper_type"] = "CL"
     cl_clean_df["pdf_url"] = concatenated_df["URL"]
+    return cl_clean_df
 
-    cl_clean_df.to_csv(
-        output_file, sep=",", index=False, encoding="utf-8", quoting=csv.QUOTE_ALL
-    )
+
+def process_cl_papers(cl_xlsx: str, slot_xlsx: str, output_file: str):
+    raw_df = read_excel(cl_xlsx)
+    slots_df = read_excel(slot_xlsx, 1)
+    write_papers_csv(format_cl_papers(raw_df, slots_df), output_file)
 
 
 if __name__ == "__main__":
@@ -51,10 +58,11 @@ if __name__ == "__main__":
         "--qa_session_xlsx",
         help="ACL 2020 live Q&A schedule (for authors).xlsx file to extract slots",
     )
+    add_clean_cache_argument(cmdline_parser)
     args = cmdline_parser.parse_args()
-
-    process_cl_papers(
-        cl_xlsx=args.cl_xlsx_file,
-        slot_xlsx=args.qa_session_xlsx,
-        output_file=args.output_file,
-    )
+    with cleaning_cache(args.clean_cache):
+        process_cl_papers(
+            cl_xlsx=args.cl_xlsx_file,
+            slot_xlsx=args.qa_session_xlsx,
+            output_file=args.output_file,
+        )
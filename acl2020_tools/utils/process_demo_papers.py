@@ -1,24 +1,40 @@
 import argparse
-import csv
 
 import pandas as pd
 
 from acl2020_tools.utils.paper_import import (
-    clean_abstract,
+    add_clean_cache_argument,
+    clean_abstracts,
     clean_title,
+    cleaning_cache,
     miniconf_join_list,
     parse_authors,
+    write_papers_csv,
 )
+from acl2020_tools.utils.spreadsheet_cache import read_excel
 
+demo_colnames = [
+    "UID",
+    "title",
+    "authors",
+    "abstract",
+    "keywords",
+    "track",
+    "paper_type",
+    "pdf_url",
+    "demo_url",
+]
 
-def main(demo_papers_xlsx: str, demo_ids_xlsx: str, output_file: str):
-    demo_papers_df = pd.read_excel(demo_papers_xlsx)
-    demo_papers_df.drop_duplicates("UID", inplace=True, keep="first")
-    demo_ids_df = pd.read_excel(demo_ids_xlsx)
+
+def format_demo_papers(
+    demo_papers_df: pd.DataFrame, demo_ids_df: pd.DataFrame
+) -> pd.DataFrame:
+    demo_papers_df = demo_papers_df.drop_duplicates("UID", keep="first")
+    demo_ids_df = demo_ids_df.copy()
     demo_ids_df.set_index("SubID", inplace=True, drop=True, verify_integrity=True)
 
     sub_ids = [row.get("UID") for _, row in demo_papers_df.iterrows()]
-    demo_papers_df["abstract"] = demo_papers_df["abstract"].apply(clean_abstract)
+    demo_papers_df["abstract"] = clean_abstracts(demo_papers_df["abstract"])
     demo_papers_df["title"] = demo_papers_df["title"].apply(clean_title)
     demo_papers_df["authors"] = demo_papers_df["authors"].apply(
         lambda x: miniconf_join_list(parse_authors(x))
@@ -27,25 +43,14 @@ def main(demo_papers_xlsx: str, demo_ids_xlsx: str, output_file: str):
     demo_papers_df["keywords"] = ""
     demo_papers_df["pdf_url"] = demo_ids_df.loc[sub_ids].loc[:, "PDF"].tolist()
     demo_papers_df["UID"] = demo_papers_df["UID"].apply(lambda x: f"demo.{x}")
+    return demo_papers_df
+
 
-    colnames = [
-        "UID",
-        "title",
-        "authors",
-        "abstract",
-        "keywords",
-        "track",
-        "paper_type",
-        "pdf_url",
-        "demo_url",
-    ]
-    demo_papers_df.to_csv(
-        output_file,
-        sep=",",
-        index=False,
-        encoding="utf-8",
-        quoting=csv.QUOTE_ALL,
-        columns=colnames,
+def main(demo_papers_xlsx: str, demo_ids_xlsx: str, output_file: str):
+    demo_papers_df = read_excel(demo_papers_xlsx)
+    demo_ids_df = read_excel(demo_ids_xlsx)
+    write_papers_csv(
+        format_demo_papers(demo_papers_df, demo_ids_df), output_file, demo_colnames
     )
 
 
@@ -59,10 +64,11 @@ if __name__ == "__main__":
         help="demo-ids.xlsx from https://github.com/acl-org/acl-2020-virtual-conference/issues/157#issuecomment-647821450",
     )
     cmdline_parser.add_argument("--output-file", help="ooutput demo_papers.csv file")
+    add_clean_cache_argument(cmdline_parser)
     args = cmdline_parser.parse_args()
-
-    main(
-        demo_papers_xlsx=args.demo_papers_file,
-        demo_ids_xlsx=args.demo_ids_file,
-        output_file=args.output_file,
-    )
+    with cleaning_cache(args.clean_cache):
+        main(
+            demo_papers_xlsx=args.demo_papers_file,
+            demo_ids_xlsx=args.demo_ids_file,
+            output_file=args.output_file,
+        )
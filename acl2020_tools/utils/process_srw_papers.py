@@ -1,30 +1,45 @@
 import argparse
-import csv
 
 import pandas as pd
 
-from acl2020_tools.utils.paper_import import clean_abstract, clean_title
+from acl2020_tools.utils.paper_import import (
+    add_clean_cache_argument,
+    clean_abstracts,
+    clean_title,
+    cleaning_cache,
+    write_papers_csv,
+)
+from acl2020_tools.utils.spreadsheet_cache import read_excel
 
 
 def clean_authors(authors):
     return "|".join([author.strip() for author in authors.split("|")])
 
 
-def main(srw_papers_csv: str, srw_ids_xlsx: str, output_file: str):
-    srw_papers_df = pd.read_csv(
+def read_srw_papers(srw_papers_csv: str) -> pd.DataFrame:
+    return pd.read_csv(
         srw_papers_csv, sep=",", encoding="utf-8", na_values=None, keep_default_na=False
     )
-    srw_ids_df = pd.read_excel(srw_ids_xlsx)
+
+
+def format_srw_papers(
+    srw_papers_df: pd.DataFrame, srw_ids_df: pd.DataFrame
+) -> pd.DataFrame:
+    srw_ids_df = srw_ids_df.copy()
     srw_ids_df.set_index("SubID", inplace=True, drop=True, verify_integrity=True)
+    srw_papers_df = srw_papers_df.copy()
     sub_ids = [int(row.get("UID")[4:]) for _, row in srw_papers_df.iterrows()]
-    srw_papers_df["abstract"] = srw_papers_df["abstract"].apply(clean_abstract)
+    srw_papers_df["abstract"] = clean_abstracts(srw_papers_df["abstract"])
     srw_papers_df["authors"] = srw_papers_df["authors"].apply(clean_authors)
     srw_papers_df["title"] = srw_papers_df["title"].apply(clean_title)
     srw_papers_df["pdf_url"] = srw_ids_df.loc[sub_ids].loc[:, "Anthology link"].tolist()
+    return srw_papers_df
 
-    srw_papers_df.to_csv(
-        output_file, sep=",", index=False, encoding="utf-8", quoting=csv.QUOTE_ALL
-    )
+
+def main(srw_papers_csv: str, srw_ids_xlsx: str, output_file: str):
+    srw_papers_df = read_srw_papers(srw_papers_csv)
+    srw_ids_df = read_excel(srw_ids_xlsx)
+    write_papers_csv(format_srw_papers(srw_papers_df, srw_ids_df), output_file)
 
 
 if __name__ == "__main__":
@@ -37,10 +52,11 @@ if __name__ == "__main__":
         help="srw-ids.xlsx from https://github.com/acl-org/acl-2020-virtual-conference/issues/157#issuecomment-647821450",
     )
     cmdline_parser.add_argument("--output-file", help="ooutput srw_papers.csv file")
+    add_clean_cache_argument(cmdline_parser)
     args = cmdline_parser.parse_args()
-
-    main(
-        srw_papers_csv=args.srw_papers_file,
-        srw_ids_xlsx=args.srw_ids_file,
-        output_file=args.output_file,
-    )
+    with cleaning_cache(args.clean_cache):
+        main(
+            srw_papers_csv=args.srw_papers_file,
+            srw_ids_xlsx=args.srw_ids_file,
+            output_file=args.output_file,
+        )
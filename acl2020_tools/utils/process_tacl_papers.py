@@ -1,22 +1,26 @@
 import argparse
-import csv
 
 import pandas as pd
 
-from acl2020_tools.utils.paper_import import clean_abstract, clean_title, extract_slot
+from acl2020_tools.utils.paper_import import (
+    add_clean_cache_argument,
+    clean_abstracts,
+    clean_title,
+    cleaning_cache,
+    extract_slot,
+    write_papers_csv,
+)
+from acl2020_tools.utils.spreadsheet_cache import read_excel
 
 
 def reformat_to_psv(org_format: str, sep: str):
     return "|".join(x.strip() for x in org_format.split(sep))
 
 
-def process_tacl_papers(tacl_xlsx: str, slot_xlsx: str, output_file: str):
-    raw_df = pd.read_excel(tacl_xlsx)
-
-    slots_df = pd.read_excel(slot_xlsx, 1)
+def format_tacl_papers(raw_df: pd.DataFrame, slots_df: pd.DataFrame) -> pd.DataFrame:
     tacl_slots = slots_df.loc[
         slots_df["paper pub venue"].apply(lambda x: x.strip().lower()) == "tacl"
-    ]
+    ].copy()
     tacl_slots["ID"] = tacl_slots["ID"].apply(lambda x: int(str(x)[2:]))
     concatenated_df = pd.merge(raw_df, tacl_slots, on="ID")
 
@@ -29,17 +33,20 @@ def process_tacl_papers(tacl_xlsx: str, slot_xlsx: str, output_file: str):
     tacl_clean_df["authors"] = concatenated_df["Authors_x"].apply(
         reformat_to_psv, args=(",")
     )
-    tacl_clean_df["abstract"] = concatenated_df["Abstract"].apply(clean_abstract)
+    tacl_clean_df["abstract"] = clean_abstracts(concatenated_df["Abstract"])
     tacl_clean_df["paper_track"] = concatenated_df["slot 1"].apply(extract_slot)
     tacl_clean_df["paper_type"] = "TACL"
     tacl_clean_df["pdf_url"] = concatenated_df["Links"]
     tacl_clean_df["emails"] = concatenated_df["Emails"].apply(
         reformat_to_psv, args=(";")
     )
+    return tacl_clean_df
 
-    tacl_clean_df.to_csv(
-        output_file, sep=",", index=False, encoding="utf-8", quoting=csv.QUOTE_ALL
-    )
+
+def process_tacl_papers(tacl_xlsx: str, slot_xlsx: str, output_file: str):
+    raw_df = read_excel(tacl_xlsx)
+    slots_df = read_excel(slot_xlsx, 1)
+    write_papers_csv(format_tacl_papers(raw_df, slots_df), output_file)
 
 
 if __name__ == "__main__":
@@ -55,10 +62,11 @@ if __name__ == "__main__":
         help="ACL 2020 live Q&A schedule (for authors).xlsx file to extract slots",
     )
     cmdline_parser.add_argument("--output_file", help="output tacl_papers.csv file")
+    add_clean_cache_argument(cmdline_parser)
     args = cmdline_parser.parse_args()
-
-    process_tacl_papers(
-        tacl_xlsx=args.tacl_xlsx_file,
-        slot_xlsx=args.qa_session_xlsx,
-        output_file=args.output_file,
-    )
+    with cleaning_cache(args.clean_cache):
+        process_tacl_papers(
+            tacl_xlsx=args.tacl_xlsx_file,
+            slot_xlsx=args.qa_session_xlsx,
+            output_file=args.output_file,
+        )
@@ -3,9 +3,10 @@ import re
 from collections import defaultdict
 from datetime import datetime
 
-import pandas as pd
 import yaml
 
+from acl2020_tools.utils.spreadsheet_cache import read_excel
+
 re_session_extract = re.compile(
     r"\w+ (\w+) (\d+), (\d+) (\d+\w) [\w\d\s:\-.,()]+-\d+ (\d+):(\d\d) UTC(.*)"
 )
@@ -44,7 +45,7 @@ def parse_arguments():
 
 def main():
     args = parse_arguments()
-    track_details = pd.read_excel(args.track_file, args.sheet_name)
+    track_details = read_excel(args.track_file, args.sheet_name)
     track_details.rename(columns={"paper pub venue": "PaperPubVenue"}, inplace=True)
 
     track_details["Date1"], track_details["Session1"] = zip(
@@ -2,10 +2,12 @@ import argparse
 import csv
 import json
 
+import numpy as np
 import sklearn.manifold
-import torch
 import umap  # type: ignore
 
+from acl2020_tools.utils.embedding_store import load_embeddings, matrix_rows
+
 # No type stubs for umap-learn. Ignore mypy
 
 
@@ -13,7 +15,9 @@ def parse_arguments():
     parser = argparse.ArgumentParser(description="MiniConf Portal Command Line")
     parser.add_argument("papers", default=False, help="paper file")
 
-    parser.add_argument("embeddings", default=False, help="embeddings file to shrink")
+    parser.add_argument(
+        "embeddings", default=False, help="embeddings file to shrink (.torch|.npy)"
+    )
     parser.add_argument("--projection-method", default="tsne", help="[umap|tsne]")
 
     return parser.parse_args()
@@ -21,20 +25,22 @@ def parse_arguments():
 
 if __name__ == "__main__":
     args = parse_arguments()
-    emb = torch.load(args.embeddings)
+    matrix, uids = load_embeddings(args.embeddings)
+    emb = np.asarray(matrix, dtype=np.float32)
     if args.projection_method == "tsne":
-        out = sklearn.manifold.TSNE(n_components=2).fit_transform(emb.numpy())
+        out = sklearn.manifold.TSNE(n_components=2).fit_transform(emb)
     elif args.projection_method == "umap":
         out = umap.UMAP(
             n_neighbors=5, min_dist=0.3, metric="correlation", n_components=2
-        ).fit_transform(emb.numpy())
+        ).fit_transform(emb)
     else:
         print("invalid projection-method: {}".format(args.projection_method))
         print("Falling back to T-SNE")
-        out = sklearn.manifold.TSNE(n_components=2).fit_transform(emb.numpy())
-    d = []
+        out = sklearn.manifold.TSNE(n_components=2).fit_transform(emb)
     with open(args.papers, "r") as f:
-        abstracts = list(csv.DictReader(f))
-        for i, row in enumerate(abstracts):
-            d.append({"id": row["UID"], "pos": out[i].tolist()})
+        paper_uids = [row["UID"] for row in csv.DictReader(f)]
+    d = [
+        {"id": uid, "pos": out[row].tolist()}
+        for uid, row in zip(paper_uids, matrix_rows(paper_uids, uids))
+    ]
     print(json.dumps(d))
@@ -0,0 +1,77 @@
+"""
+Cache of parsed organizer spreadsheets.
+
+Parsing xls/xlsx files with xlrd/openpyxl is slow, and the same spreadsheets are
+read by many scripts. read_excel() converts each sheet once and serves later
+reads from a Feather file (or a pickle when the frame can't round-trip through
+Arrow, e.g. mixed-type or datetime.time columns).
+"""
+import hashlib
+import os
+
+import pandas as pd
+
+CACHE_DIR = os.environ.get(
+    "ACL2020_SPREADSHEET_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "acl2020_spreadsheets"),
+)
+
+# Content hashes of the files seen in this process, keyed by (path, mtime, size)
+file_hashes = {}
+
+
+def file_hash(path: str) -> str:
+    stat = os.stat(path)
+    stamp = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if stamp not in file_hashes:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        file_hashes[stamp] = digest.hexdigest()
+    return file_hashes[stamp]
+
+
+def cache_key(path: str, sheet_name, kwargs) -> str:
+    options = repr((sheet_name, sorted(kwargs.items())))
+    return hashlib.sha256((file_hash(path) + options).encode("utf-8")).hexdigest()
+
+
+def write_feather(df: pd.DataFrame, cache_file: str) -> bool:
+    """ Writes df as Feather if it reads back identically """
+    try:
+        df.to_feather(cache_file)
+        pd.testing.assert_frame_equal(pd.read_feather(cache_file), df)
+        return True
+    except Exception:  # pylint: disable=broad-except
+        if os.path.exists(cache_file):
+            os.remove(cache_file)
+        return False
+
+
+def store(df: pd.DataFrame, key: str):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    base = os.path.join(CACHE_DIR, key)
+    tmp_file = "{}.{}.tmp".format(base, os.getpid())
+    if write_feather(df, tmp_file):
+        os.replace(tmp_file, base + ".feather")
+    else:
+        df.to_pickle(tmp_file)
+        os.replace(tmp_file, base + ".pkl")
+
+
+def read_excel(path: str, sheet_name=0, **kwargs) -> pd.DataFrame:
+    """ Drop-in for pd.read_excel(path, sheet_name, ...) of a single sheet """
+    if sheet_name is None or isinstance(sheet_name, list):
+        return pd.read_excel(path, sheet_name, **kwargs)
+
+    key = cache_key(path, sheet_name, kwargs)
+    base = os.path.join(CACHE_DIR, key)
+    if os.path.exists(base + ".feather"):
+        return pd.read_feather(base + ".feather")
+    if os.path.exists(base + ".pkl"):
+        return pd.read_pickle(base + ".pkl")
+
+    df = pd.read_excel(path, sheet_name, **kwargs)
+    store(df, key)
+    return df
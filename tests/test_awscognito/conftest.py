@@ -0,0 +1,46 @@
+import os
+import sys
+from dataclasses import dataclass
+
+# The awscognito scripts import their sibling modules as top-level modules
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(__file__), os.pardir, os.pardir, "acl2020_tools", "awscognito"
+    ),
+)
+os.environ.setdefault("ACL2020_USER_POOL_ID", "us-east-1_test")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+# Imported once the awscognito directory is on the path
+from cognito_fake import FakeCognitoClient  # pylint: disable=wrong-import-position
+
+PROFILE = {"user_pool_id": "fake"}
+
+
+@dataclass(frozen=True)
+class User:
+    email: str
+    name: str
+
+
+def fake_pool(emails=(), groups=None, names=None):
+    """ A FakeCognitoClient without quotas holding the users of emails; groups
+    maps each group to its members and names gives their custom:name """
+    groups = groups or {}
+    client = FakeCognitoClient(quota_scale=0, groups=list(groups))
+    for email in emails:
+        attributes = [{"Name": "email", "Value": email}]
+        if names:
+            attributes.append({"Name": "custom:name", "Value": names[email]})
+        client.admin_create_user(
+            UserPoolId=PROFILE["user_pool_id"],
+            Username=email,
+            UserAttributes=attributes,
+        )
+    for group, members in groups.items():
+        for email in members:
+            client.admin_add_user_to_group(
+                UserPoolId=PROFILE["user_pool_id"], Username=email, GroupName=group
+            )
+    return client
@@ -0,0 +1,37 @@
+import cognito
+import cognito_bulk
+from cognito_fake import FakeCognitoClient
+
+from .conftest import PROFILE, User, fake_pool
+
+
+def test_fake_pool_behaves_like_boto3():
+    client = fake_pool(groups={"attendees": []})
+    users = [User(email=f"user{i}@example.com", name=f"User {i}") for i in range(130)]
+    executor = cognito_bulk.BulkExecutor(client, PROFILE, workers=8, rate_scale=100)
+    steps = [cognito_bulk.create_step(), cognito_bulk.add_step("attendees")]
+    assert all(result.status == "ok" for result in executor.run(users, steps))
+
+    response = cognito.create_user(client, PROFILE, users[0])
+    assert response["Error"]["Code"] == "UsernameExistsException"
+    response = cognito.disable_user(client, PROFILE, User("nobody@example.com", ""))
+    assert response["Error"]["Code"] == "UserNotFoundException"
+
+    listed = list(cognito.iter_users(client, PROFILE))
+    assert sorted(user.email for user in listed) == sorted(user.email for user in users)
+    assert {user.custom_name for user in listed} == {user.name for user in users}
+    members = cognito.list_group_users(client, PROFILE, "attendees")
+    assert {user.email for user in members} == {user.email for user in users}
+    assert client.calls["list_users"] == 3
+
+
+def test_executor_retries_injected_throttling():
+    client = FakeCognitoClient(quota_scale=0, throttle_rate=0.3, seed=1)
+    users = [User(email=f"user{i}@example.com", name="") for i in range(50)]
+    executor = cognito_bulk.BulkExecutor(
+        client, PROFILE, workers=4, rate_scale=100, base_delay=0.001
+    )
+    results = executor.run(users, [cognito_bulk.create_step()])
+    assert all(result.status == "ok" for result in results)
+    assert client.errors["TooManyRequestsException"] > 0
+    assert len(client.users) == 50
@@ -0,0 +1,65 @@
+import argparse
+import os
+
+import pytest
+
+import cognito_groups
+
+from .conftest import PROFILE, fake_pool
+
+EMAILS = [f"user{i:02}@example.com" for i in range(20)]
+
+
+def group_args(tmp_path):
+    return argparse.Namespace(
+        checkpoint=str(tmp_path / "disable.checkpoint"),
+        workers=1,
+        rate_scale=100,
+        results=None,
+        snapshot=str(tmp_path / "snapshot.sqlite"),
+    )
+
+
+def test_skips_checkpointed_and_already_disabled_members(tmp_path):
+    client = fake_pool(EMAILS, {"attendees": EMAILS})
+    client.users[EMAILS[0]]["enabled"] = False
+    args = group_args(tmp_path)
+    with open(args.checkpoint, "w") as checkpoint_file:
+        checkpoint_file.write(EMAILS[1] + "\n" + EMAILS[2] + "\n")
+
+    data = {"client": client, "profile": PROFILE}
+    cognito_groups.run_group_action(args, data, "attendees", enable=False)
+
+    assert client.calls["admin_disable_user"] == len(EMAILS) - 3
+    assert not client.users[EMAILS[3]]["enabled"]
+    # Every user went through, so there is nothing left to resume
+    assert not os.path.exists(args.checkpoint)
+
+
+def test_interrupted_run_resumes_from_the_checkpoint(tmp_path):
+    client = fake_pool(EMAILS, {"attendees": EMAILS})
+    disable = client.admin_disable_user
+
+    def interrupted(**kwargs):
+        if client.calls["admin_disable_user"] == 5:
+            raise KeyboardInterrupt
+        return disable(**kwargs)
+
+    client.admin_disable_user = interrupted
+    args = group_args(tmp_path)
+    data = {"client": client, "profile": PROFILE}
+    with pytest.raises(KeyboardInterrupt):
+        cognito_groups.run_group_action(args, data, "attendees", enable=False)
+
+    # The pending users were cancelled instead of run after the interrupt
+    assert client.calls["admin_disable_user"] < len(EMAILS) - 1
+    with open(args.checkpoint) as checkpoint_file:
+        done = checkpoint_file.read().split()
+    assert done == [email for email in EMAILS if not client.users[email]["enabled"]]
+
+    client.admin_disable_user = disable
+    before = client.calls["admin_disable_user"]
+    cognito_groups.run_group_action(args, data, "attendees", enable=False)
+    assert client.calls["admin_disable_user"] - before == len(EMAILS) - len(done)
+    assert not any(client.users[email]["enabled"] for email in EMAILS)
+    assert not os.path.exists(args.checkpoint)
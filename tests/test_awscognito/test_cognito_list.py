@@ -0,0 +1,50 @@
+import csv
+
+import cognito_list
+import cognito_snapshot
+
+from .conftest import PROFILE, fake_pool
+
+GROUPS = {
+    "attendees": ["a@x.org", "b@x.org", "c@x.org"],
+    "chairs": ["b@x.org"],
+    "volunteers": ["b@x.org", "c@x.org"],
+}
+EMAILS = ["a@x.org", "b@x.org", "c@x.org", "d@x.org"]
+NAMES = {email: email[0].upper() for email in EMAILS}
+
+
+def test_group_memberships_index_users_by_email():
+    source = cognito_snapshot.LiveSource(fake_pool(EMAILS, GROUPS, NAMES), PROFILE)
+    group_names, memberships, names = cognito_list.group_memberships(source)
+
+    assert group_names == list(GROUPS)
+    assert memberships == {
+        "a@x.org": {"attendees"},
+        "b@x.org": {"attendees", "chairs", "volunteers"},
+        "c@x.org": {"attendees", "volunteers"},
+    }
+    assert names == {"a@x.org": "A", "b@x.org": "B", "c@x.org": "C"}
+
+    duplicates = cognito_list.find_duplicate(source, workers=2)
+    assert sorted((user.email, user.committee) for user in duplicates) == [
+        ("b@x.org", "attendees|chairs|volunteers"),
+        ("c@x.org", "attendees|volunteers"),
+    ]
+
+
+def test_save_matrix_from_a_snapshot(tmp_path):
+    snapshot = cognito_snapshot.Snapshot(str(tmp_path / "snapshot.sqlite"))
+    snapshot.refresh(fake_pool(EMAILS, GROUPS, NAMES), PROFILE)
+    path = str(tmp_path / "membership.csv")
+
+    cognito_list.save_matrix(snapshot, path)
+
+    with open(path, newline="") as csv_file:
+        rows = list(csv.reader(csv_file))
+    assert rows[0] == ["email", "name", "attendees", "chairs", "volunteers"]
+    assert sorted(rows[1:]) == [
+        ["a@x.org", "A", "1", "0", "0"],
+        ["b@x.org", "B", "1", "1", "1"],
+        ["c@x.org", "C", "1", "0", "1"],
+    ]
@@ -0,0 +1,61 @@
+import json
+
+import cognito
+import cognito_metrics
+
+from .conftest import PROFILE, fake_pool
+
+
+def test_instrumented_client_records_calls_and_errors(monkeypatch, tmp_path):
+    metrics = cognito_metrics.Metrics()
+    monkeypatch.setattr(cognito_metrics, "metrics", metrics)
+    client = cognito_metrics.InstrumentedClient(fake_pool(groups={"attendees": []}))
+    for i in range(3):
+        client.admin_create_user(
+            UserPoolId="fake",
+            Username=f"user{i}@example.com",
+            UserAttributes=[{"Name": "email", "Value": f"user{i}@example.com"}],
+        )
+    try:
+        client.admin_disable_user(UserPoolId="fake", Username="nobody@example.com")
+    except client.exceptions.UserNotFoundException:
+        pass
+    assert len(list(cognito.iter_users(client, PROFILE))) == 3
+    metrics.retried("admin_create_user", 2)
+    for seconds in [0.001, 0.03, 0.03, 20.0]:
+        metrics.observe("sample", seconds, "ok")
+
+    apis = metrics.to_dict()
+    create = apis["admin_create_user"]
+    assert create["count"] == 3
+    assert create["outcomes"] == {"ok": 3}
+    assert create["retries"] == 2
+    assert create["buckets"]["10.0"] == 3
+    assert apis["admin_disable_user"]["outcomes"] == {"UserNotFoundException": 1}
+    assert apis["list_users"]["count"] == 1
+    buckets = apis["sample"]["buckets"]
+    assert [buckets[bound] for bound in ["0.005", "0.025", "0.05", "10.0"]] == [
+        1,
+        1,
+        3,
+        3,
+    ]
+    assert apis["sample"]["count"] == 4
+
+    metrics.save(str(tmp_path / "metrics.json"))
+    with open(tmp_path / "metrics.json") as metrics_file:
+        assert json.load(metrics_file) == apis
+
+    metrics.save(str(tmp_path / "metrics.prom"))
+    prom = (tmp_path / "metrics.prom").read_text()
+    assert (
+        'cognito_request_duration_seconds_bucket{api="admin_create_user",le="+Inf"} 3'
+        in prom
+    )
+    assert 'cognito_request_duration_seconds_count{api="list_users"} 1' in prom
+    assert (
+        'cognito_requests_total{api="admin_disable_user",'
+        'outcome="UserNotFoundException"} 1' in prom
+    )
+    assert 'cognito_request_duration_seconds_bucket{api="sample",le="+Inf"} 4' in prom
+    assert 'cognito_retries_total{api="admin_create_user"} 2' in prom
@@ -0,0 +1,78 @@
+import argparse
+
+import cognito_reconcile
+from cognito import CognitoUser
+
+from .conftest import User
+
+
+def operation(**selected):
+    options = dict(
+        disable=False, enable=False, remove_from_group=None, verified=False, group=None
+    )
+    options.update(selected)
+    return argparse.Namespace(**options)
+
+
+def pool_user(email, name, enabled=True, verified="true"):
+    return CognitoUser(
+        username=email,
+        email=email,
+        custom_name=name,
+        user_status="CONFIRMED",
+        email_verified=verified,
+        enabled=enabled,
+    )
+
+
+def planned(changes):
+    return {change.user.email: change.notes for change in changes}
+
+
+POOL = {
+    "a@x.org": pool_user("a@x.org", "A"),
+    "b@x.org": pool_user("b@x.org", "Old B", verified=None),
+    "c@x.org": pool_user("c@x.org", "C", enabled=False),
+}
+
+
+def test_plan_creates_updates_and_adds_to_group():
+    users = [User("a@x.org", "A"), User("b@x.org", "B"), User("new@x.org", "N")]
+    changes = cognito_reconcile.plan_changes(
+        operation(group="attendees"), users, POOL, {"a@x.org": POOL["a@x.org"]}
+    )
+    assert planned(changes) == {
+        "b@x.org": [
+            "set custom:name: 'Old B' -> 'B'",
+            "set email_verified: '(unset)' -> 'true'",
+            "add to attendees",
+        ],
+        "new@x.org": ["create (N)", "add to attendees"],
+    }
+
+
+def test_plan_prunes_members_missing_from_the_file():
+    members = {email: POOL[email] for email in ["a@x.org", "c@x.org"]}
+    changes = cognito_reconcile.plan_changes(
+        operation(group="attendees"), [User("a@x.org", "A")], POOL, members, prune=True
+    )
+    assert planned(changes) == {"c@x.org": ["remove from attendees"]}
+    assert [step.name for step in changes[0].steps] == ["remove"]
+
+
+def test_plan_ignores_duplicate_rows_and_reports_missing_users(capsys):
+    users = [User("c@x.org", "C"), User("c@x.org", "C"), User("gone@x.org", "G")]
+    args = operation(enable=True)
+    changes = cognito_reconcile.plan_changes(args, users, POOL, {})
+    assert planned(changes) == {"c@x.org": ["enable"]}
+    assert len(changes[0].steps) == 1
+
+    missing = cognito_reconcile.missing_users(args, users, POOL)
+    assert missing == ["gone@x.org"]
+    cognito_reconcile.print_plan(changes, users, missing)
+    output = capsys.readouterr().out
+    assert "gone@x.org: not in the pool, skipped" in output
+    assert (
+        "1 requests for 1 users; 0 of the 2 users in the file are up to date, "
+        "1 are not in the pool" in output
+    )
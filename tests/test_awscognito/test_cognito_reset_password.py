@@ -0,0 +1,62 @@
+import json
+import sys
+
+import pytest
+
+import cognito
+import cognito_reset_password
+
+from .conftest import fake_pool
+
+EXISTING = ["a@x.org", "b@x.org", "c@x.org"]
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    client = fake_pool(EXISTING)
+    monkeypatch.setattr(cognito, "init_client", lambda profile: client)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "profile.yml").write_text("backend: fake\nuser_pool_id: fake\n")
+    return client
+
+
+def test_read_emails_finds_the_email_column(tmp_path):
+    path = tmp_path / "users.csv"
+    path.write_text("Name, E-mail ,Email \nA,x,a@x.org \nB,y,\n")
+    assert cognito_reset_password.read_emails(str(path)) == ["a@x.org"]
+
+    path.write_text("name,address\nA,a@x.org\n")
+    with pytest.raises(ValueError, match="no email column"):
+        cognito_reset_password.read_emails(str(path))
+
+
+def test_reset_from_file_dedupes_and_writes_jsonl_results(client, monkeypatch):
+    with open("users.csv", "w") as users_file:
+        users_file.write("email\nb@x.org\nc@x.org\nb@x.org\nnobody@x.org\n")
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["cognito_reset_password.py", "--rate-scale", "100", "-f", "users.csv"]
+        + ["profile.yml", "a@x.org", "c@x.org"],
+    )
+
+    args = cognito_reset_password.parse_arguments()
+    results = cognito_reset_password.reset_password(args)
+
+    assert args.results == "reset_results.jsonl"
+    assert [result.email for result in results] == [
+        "a@x.org",
+        "c@x.org",
+        "b@x.org",
+        "nobody@x.org",
+    ]
+    assert client.calls["admin_set_user_password"] == 4
+    # Each existing user gets the invitation resent once
+    assert client.calls["admin_create_user"] == len(EXISTING) + 3
+
+    with open("reset_results.jsonl") as results_file:
+        rows = [json.loads(line) for line in results_file]
+    assert [row["email"] for row in rows] == [result.email for result in results]
+    assert [row["status"] for row in rows] == ["ok"] * 3 + ["UserNotFoundException"]
+    assert rows[0]["steps"] == ["set password:ok", "resend:ok"]
+    assert rows[3]["steps"] == ["set password:UserNotFoundException"]
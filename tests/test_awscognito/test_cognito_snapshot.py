@@ -0,0 +1,65 @@
+import argparse
+
+import cognito_bulk
+import cognito_snapshot
+
+from .conftest import PROFILE, User, fake_pool
+
+
+def bulk_args(*argv):
+    parser = argparse.ArgumentParser()
+    cognito_bulk.add_arguments(parser)
+    parser.add_argument("--debug", action="store_true")
+    for flag in ["--disable", "--enable", "--verified"]:
+        parser.add_argument(flag, action="store_true")
+    parser.add_argument("--group")
+    parser.add_argument("--remove-from-group")
+    return parser.parse_args(argv)
+
+
+def test_snapshot_ttl_and_invalidation(tmp_path):
+    client = fake_pool(groups={"attendees": []})
+    users = [User(f"user{i}@example.com", f"User {i}") for i in range(5)]
+    cognito_bulk.BulkExecutor(client, PROFILE, rate_scale=100).run(
+        users, [cognito_bulk.create_step(), cognito_bulk.add_step("attendees")]
+    )
+
+    path = str(tmp_path / "snapshot.sqlite")
+    snapshot = cognito_snapshot.Snapshot(path)
+    assert not snapshot.is_fresh(900, "fake")
+    snapshot.refresh(client, PROFILE)
+    assert snapshot.is_fresh(900, "fake")
+    assert not snapshot.is_fresh(0, "fake")
+    assert not snapshot.is_fresh(900, "another-pool")
+    emails = sorted(user.email for user in snapshot.iter_users())
+    assert emails == sorted(user.email for user in users)
+    assert len(list(snapshot.iter_group_users("attendees"))) == 5
+
+    cognito_snapshot.invalidate(path)
+    assert not snapshot.is_fresh(900, "fake")
+
+
+def test_open_source_only_lists_the_pool_when_stale(tmp_path):
+    client = fake_pool()
+    args = argparse.Namespace(
+        live=False, refresh=False, ttl=900, snapshot=str(tmp_path / "s.sqlite")
+    )
+    cognito_snapshot.open_source(args, client, PROFILE)
+    cognito_snapshot.open_source(args, client, PROFILE)
+    assert client.calls["list_users"] == 1
+
+    args.refresh = True
+    cognito_snapshot.open_source(args, client, PROFILE)
+    assert client.calls["list_users"] == 2
+
+
+def test_bulk_run_invalidates_the_given_snapshot(tmp_path):
+    client = fake_pool()
+    path = str(tmp_path / "custom.sqlite")
+    snapshot = cognito_snapshot.Snapshot(path)
+    snapshot.refresh(client, PROFILE)
+
+    args = bulk_args("--snapshot", path, "--rate-scale", "100")
+    cognito_bulk.run_from_args(args, client, PROFILE, [User("a@example.com", "A")])
+
+    assert not snapshot.is_fresh(900, "fake")
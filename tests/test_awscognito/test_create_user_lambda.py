@@ -0,0 +1,75 @@
+import json
+import time
+
+import boto3
+from botocore.stub import Stubber
+
+import create_user_lambda
+from cognito_fake import FakeCognitoClient
+
+POOL = {"user_pool_id": "us-east-1_test"}
+
+
+def record(message_id, email, name="A Name"):
+    return {"messageId": message_id, "body": json.dumps({"email": email, "name": name})}
+
+
+def test_handle_batch_deduplicates_and_only_reports_retryable_failures(capsys):
+    client = boto3.client(
+        "cognito-idp",
+        region_name="us-east-1",
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+    )
+    stubber = Stubber(client)
+    ok = {"ResponseMetadata": {"HTTPStatusCode": 200}}
+    stubber.add_response("admin_create_user", ok)
+    stubber.add_response("admin_add_user_to_group", ok)
+    stubber.add_client_error("admin_create_user", "UsernameExistsException")
+    stubber.add_response("admin_add_user_to_group", ok)
+    stubber.add_client_error("admin_create_user", "InvalidParameterException")
+    stubber.add_client_error("admin_create_user", "InternalErrorException")
+
+    records = [
+        record("1", "a@example.com"),
+        record("2", " A@example.com "),
+        record("3", "b@example.com"),
+        record("4", "c@example.com"),
+        {"messageId": "5", "body": "not json"},
+        {"messageId": "6", "body": json.dumps({"email": "d@example.com"})},
+        record("7", "e@example.com"),
+    ]
+    with stubber:
+        failed = create_user_lambda.handle_batch(records, client, POOL, "attendees", 1)
+    stubber.assert_no_pending_responses()
+    # Only the internal error is retried; 4 is rejected, 5 and 6 are malformed
+    assert failed == ["7"]
+    assert "3 dropped" in capsys.readouterr().out
+
+
+class Context:
+    def __init__(self, remaining_ms):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+def test_handle_batch_stops_retrying_at_the_deadline():
+    client = FakeCognitoClient(quota_scale=0, throttle_rate=1.0, groups=["attendees"])
+    records = [record(str(i), f"user{i}@example.com") for i in range(20)]
+
+    start = time.monotonic()
+    failed = create_user_lambda.handle_batch(
+        records, client, POOL, "attendees", 4, time.monotonic() + 0.5
+    )
+    assert time.monotonic() - start < 2
+    assert sorted(failed, key=int) == [str(i) for i in range(20)]
+
+
+def test_deadline_leaves_a_margin_before_the_timeout():
+    now = time.monotonic()
+    deadline = create_user_lambda.deadline_of(Context(30000))
+    margin = 30 - create_user_lambda.TIME_MARGIN
+    assert now + margin <= deadline <= time.monotonic() + margin
+    assert create_user_lambda.deadline_of(Context(1000)) <= time.monotonic()
@@ -0,0 +1,61 @@
+import os
+import sys
+
+# The chat scripts import their sibling modules as top-level modules
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(__file__), os.pardir, os.pardir, "acl2020_tools", "chat"
+    ),
+)
+
+
+class Response:
+    """ The parts of requests.Response that the chat scripts use """
+
+    def __init__(self, data, status_code=200, headers=None):
+        self.data = data
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.reason = "OK" if status_code < 400 else "Error"
+
+    def json(self):
+        return self.data
+
+
+class FakeRocket:
+    """ Records the calls; channels in `existing` can't be created again and
+    users in `banned` can't be invited """
+
+    def __init__(self, existing=(), banned=()):
+        self.existing = set(existing)
+        self.banned = set(banned)
+        self.calls = []
+
+    def channels_create(self, name):
+        self.calls.append(("create", name))
+        if name in self.existing:
+            return Response({"success": False, "error": "error-duplicate-channel-name"})
+        return Response({"success": True, "channel": {"_id": "new-" + name}})
+
+    def channels_info(self, channel):
+        self.calls.append(("info", channel))
+        return Response({"success": True, "channel": {"_id": "old-" + channel}})
+
+    def channels_set_topic(self, room_id, topic):
+        self.calls.append(("topic", room_id, topic))
+        return Response({"success": True})
+
+    def channels_set_description(self, room_id, description):
+        self.calls.append(("description", room_id, description))
+        return Response({"success": True})
+
+    def channels_invite(self, room_id, user_id):
+        self.calls.append(("invite", room_id, user_id))
+        if user_id in self.banned:
+            return Response({"success": False, "error": "error-not-allowed"}, 400)
+        return Response({"success": True})
+
+    def channels_add_owner(self, room_id, user_id=None):
+        self.calls.append(("owner", room_id, user_id))
+        return Response({"success": True})
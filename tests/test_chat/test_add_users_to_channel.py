@@ -0,0 +1,53 @@
+import pandas as pd
+
+import add_users_to_channel
+import rocket_jobs
+
+from .conftest import FakeRocket
+
+
+def test_resolve_user_ids_through_the_email_index():
+    user_dump = pd.DataFrame(
+        {
+            "_id": ["u1", "u2", "u3", "u4"],
+            "emails": [
+                ["a@x.org", "alias@x.org"],
+                ["B@x.org"],
+                ["shared@x.org"],
+                ["shared@x.org", ""],
+            ],
+        }
+    )
+    assignments = pd.DataFrame(
+        {
+            "email": ["alias@x.org", "b@x.org ", "shared@x.org", "nobody@x.org"],
+            "channel": ["c1", "c1", "c2", "c2"],
+        }
+    )
+
+    resolved = add_users_to_channel.resolve_user_ids(assignments, user_dump)
+
+    assert list(resolved["channel"]) == ["c1", "c1", "c2", "c2"]
+    assert list(resolved["user_id"].fillna("")) == ["u1", "u2", "", ""]
+    assert list(resolved["error"].fillna("")) == [
+        "",
+        "",
+        ">1 user found registered",
+        "No user found registered",
+    ]
+
+
+def test_add_users_to_channel_chains_owner_after_successful_invites():
+    rows = pd.DataFrame({"channel_id": ["c1", "c1"], "user_id": ["banned", "u1"]})
+    rocket = FakeRocket(banned={"banned"})
+
+    errors = add_users_to_channel.add_users_to_channel(
+        rows, rocket, rocket_jobs.RateLimiter(), set_owner=True
+    )
+
+    assert errors == ["Invite failed: error-not-allowed", None]
+    assert rocket.calls == [
+        ("invite", "c1", "banned"),
+        ("invite", "c1", "u1"),
+        ("owner", "c1", "u1"),
+    ]
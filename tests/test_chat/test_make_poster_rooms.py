@@ -0,0 +1,59 @@
+import make_poster_rooms
+import rocket_jobs
+
+from .conftest import FakeRocket
+
+
+def paper(uid, title="Title", abstract="Abstract"):
+    return {"UID": uid, "title": title, "authors": "A|B", "abstract": abstract}
+
+
+def test_plan_rooms_only_touches_missing_and_stale_rooms():
+    papers = [paper("1"), paper("2.1", title="New title"), paper("3")]
+    channels = {
+        "paper-2-1": {"_id": "c2", "topic": "Title - A, B", "description": "Abstract"},
+        "paper-3": {"_id": "c3", "topic": "Title - A, B", "description": "Abstract\n"},
+    }
+
+    jobs = make_poster_rooms.plan_rooms(papers, channels)
+
+    assert [(p["UID"], channel_id, fields) for p, channel_id, fields in jobs] == [
+        ("1", None, {"topic": "Title - A, B", "description": "Abstract"}),
+        ("2.1", "c2", {"topic": "New title - A, B"}),
+    ]
+
+
+def test_sync_room_reuses_the_created_id():
+    rocket = FakeRocket(existing={"paper-2"})
+    limiter = rocket_jobs.RateLimiter()
+
+    for job in make_poster_rooms.plan_rooms([paper("1"), paper("2")]):
+        assert make_poster_rooms.sync_room(rocket, limiter, job) is None
+
+    assert rocket.calls == [
+        ("create", "paper-1"),
+        ("topic", "new-paper-1", "Title - A, B"),
+        ("description", "new-paper-1", "Abstract"),
+        ("create", "paper-2"),
+        ("info", "paper-2"),
+        ("topic", "old-paper-2", "Title - A, B"),
+        ("description", "old-paper-2", "Abstract"),
+    ]
+
+
+class BadGateway:
+    status_code = 502
+    headers = {}
+
+    def json(self):
+        raise ValueError("<html>502 Bad Gateway</html>")
+
+
+def test_sync_room_returns_the_error_of_a_non_json_response():
+    rocket = FakeRocket()
+    rocket.channels_set_description = lambda room_id, description: BadGateway()
+
+    job = (paper("1"), None, make_poster_rooms.room_fields(paper("1")))
+    error = make_poster_rooms.sync_room(rocket, rocket_jobs.RateLimiter(), job)
+
+    assert error == "HTTP 502"
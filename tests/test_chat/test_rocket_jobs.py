@@ -0,0 +1,50 @@
+import threading
+import time
+
+import rocket_jobs
+
+from .conftest import Response
+
+
+def test_fetch_pages_in_offset_order_with_bounded_requests_in_flight():
+    lock = threading.Lock()
+    in_flight = [0, 0]
+
+    def users_list(offset, count, fields):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        time.sleep(0.01 * (offset % 3))
+        with lock:
+            in_flight[0] -= 1
+        # The server caps the page size at 40
+        users = [{"_id": i} for i in range(offset, min(offset + 40, 500))]
+        return Response({"users": users, "total": 500, "count": len(users)})
+
+    pages = rocket_jobs.fetch_pages(
+        users_list, "users", page_size=100, workers=3, fields="{}"
+    )
+
+    assert [user["_id"] for page in pages for user in page] == list(range(500))
+    assert in_flight[1] <= 3
+
+
+def test_rate_limiter_retries_429():
+    responses = [Response({}, 429, {"Retry-After": "0"}), Response({"success": True})]
+    limiter = rocket_jobs.RateLimiter(base_delay=0)
+
+    assert limiter.call(lambda: responses.pop(0)).status_code == 200
+    assert limiter.throttled == 1
+
+
+def test_api_result():
+    assert rocket_jobs.api_result(Response({"success": True, "x": 1})) == (
+        {"success": True, "x": 1},
+        None,
+    )
+    failed = {"success": False, "error": "error-not-allowed"}
+    assert rocket_jobs.api_result(Response(failed, 400)) == (
+        failed,
+        "error-not-allowed",
+    )
+    assert rocket_jobs.api_error(Response([], 504)) == "HTTP 504"
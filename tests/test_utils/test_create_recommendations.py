@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from acl2020_tools.utils.create_recommendations import (
+    exact_neighbours,
+    ivf_neighbours,
+    normalize,
+)
+
+
+def random_vectors(n, dim=8, seed=0):
+    return normalize(np.random.RandomState(seed).randn(n, dim))
+
+
+def brute_force(vectors, k):
+    sims = vectors @ vectors.T
+    np.fill_diagonal(sims, -np.inf)
+    return np.argsort(-sims, axis=1, kind="stable")[:, :k]
+
+
+def test_exact_neighbours_match_brute_force():
+    vectors = random_vectors(50)
+    indices, scores = exact_neighbours(vectors, k=5, block_size=7)
+    assert np.array_equal(indices, brute_force(vectors, 5))
+    expected = np.take_along_axis(vectors @ vectors.T, indices, axis=1)
+    assert np.allclose(scores, expected, atol=1e-6)
+
+
+@pytest.mark.parametrize("k", [4, 5, 10])
+def test_exact_neighbours_with_k_at_least_papers(k):
+    vectors = random_vectors(5)
+    indices, scores = exact_neighbours(vectors, k=k, block_size=2)
+    assert indices.shape == scores.shape == (5, 4)
+    assert np.isfinite(scores).all()
+    for row, neighbours in enumerate(indices):
+        assert sorted(neighbours) == [i for i in range(5) if i != row]
+
+
+def test_ivf_neighbours_with_more_lists_than_papers():
+    vectors = random_vectors(6)
+    indices, scores = ivf_neighbours(vectors, k=10, n_lists=20, n_probe=20)
+    # Every list is probed, so the search is exhaustive
+    assert np.array_equal(indices, brute_force(vectors, 5))
+    assert np.isfinite(scores).all()
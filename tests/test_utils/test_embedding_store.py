@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+import torch
+
+from acl2020_tools.utils.embedding_store import (
+    load_embeddings,
+    matrix_rows,
+    save_matrix,
+    uids_path,
+)
+
+
+def test_save_matrix_round_trips_float16_with_uids(tmp_path):
+    path = str(tmp_path / "embeddings.npy")
+    embeddings = np.random.RandomState(0).randn(3, 4).astype(np.float32)
+    save_matrix(path, embeddings, ["a", "b", "c"], dtype="float16")
+
+    assert uids_path(path) == str(tmp_path / "embeddings.uids.txt")
+    matrix, uids = load_embeddings(path)
+    assert isinstance(matrix, np.memmap)
+    assert matrix.dtype == np.float16
+    np.testing.assert_allclose(matrix, embeddings, rtol=1e-3, atol=1e-3)
+    assert uids == ["a", "b", "c"]
+
+
+def test_load_embeddings_reads_torch_without_uid_index(tmp_path):
+    path = str(tmp_path / "embeddings.torch")
+    embeddings = torch.arange(6, dtype=torch.float32).reshape(3, 2)
+    torch.save(embeddings, path)
+
+    matrix, uids = load_embeddings(path)
+    np.testing.assert_array_equal(matrix, embeddings.numpy())
+    assert uids is None
+
+
+def test_load_embeddings_rejects_a_mismatched_uid_index(tmp_path):
+    path = str(tmp_path / "embeddings.npy")
+    save_matrix(path, np.zeros((2, 4)), ["a", "b"])
+    with open(uids_path(path), "a") as f:
+        f.write("c\n")
+
+    with pytest.raises(AssertionError):
+        load_embeddings(path)
+
+
+def test_matrix_rows_maps_papers_through_the_uid_index():
+    assert matrix_rows(["b", "c", "a"], ["a", "b", "c"]) == [1, 2, 0]
+    assert matrix_rows(["b", "c", "a"], None) == [0, 1, 2]
+    with pytest.raises(KeyError):
+        matrix_rows(["d"], ["a", "b", "c"])
@@ -0,0 +1,112 @@
+import csv
+import random
+import sys
+
+import pytest
+import torch
+import transformers
+
+from acl2020_tools.utils import embeddings
+from acl2020_tools.utils.embeddings import (
+    MAX_LENGTH,
+    embed_token_ids,
+    tokenize_abstracts,
+)
+
+WORDS = "we propose a novel model for neural machine translation".split()
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    """ A small randomly initialised BERT and its tokenizer saved locally, so no
+    download is needed """
+    config = transformers.BertConfig(
+        vocab_size=100,
+        hidden_size=16,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=32,
+        max_position_embeddings=64,
+    )
+    torch.manual_seed(0)
+    path = tmp_path_factory.mktemp("model")
+    transformers.BertModel(config).save_pretrained(str(path))
+    vocab = path / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS))
+    transformers.BertTokenizer(str(vocab)).save_pretrained(str(path))
+    return str(path)
+
+
+def test_sharded_embeddings_match_a_single_process(tiny_model):
+    rng = random.Random(0)
+    token_ids = [
+        [rng.randrange(1, 100) for _ in range(rng.randrange(3, 40))] for _ in range(30)
+    ]
+
+    single = embed_token_ids(token_ids, 4, 1, 2, 0, tiny_model)
+    sharded = embed_token_ids(token_ids, 4, 2, 1, 0, tiny_model)
+
+    assert single.shape == (30, 16)
+    assert torch.allclose(single, sharded, atol=1e-5)
+
+
+def test_long_abstracts_keep_the_final_separator(tmp_path):
+    vocab = tmp_path / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "word"]))
+    tokenizer = transformers.BertTokenizer(str(vocab))
+
+    short, long = tokenize_abstracts(tokenizer, ["word word", "word " * 1000])
+
+    assert short == [2, 4, 4, 3]
+    assert len(long) == MAX_LENGTH
+    assert long[0] == tokenizer.cls_token_id and long[-1] == tokenizer.sep_token_id
+
+
+def write_papers(path, abstracts):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, ["UID", "abstract"])
+        writer.writeheader()
+        writer.writerows({"UID": uid, "abstract": text} for uid, text in abstracts)
+
+
+def test_main_only_encodes_new_abstracts(tiny_model, tmp_path, monkeypatch):
+    encoded = []
+
+    def encode_missing(abstracts, args):
+        encoded.append(sorted(abstracts.values()))
+        return real_encode_missing(abstracts, args)
+
+    real_encode_missing = embeddings.encode_missing
+    monkeypatch.setattr(embeddings, "encode_missing", encode_missing)
+    monkeypatch.chdir(tmp_path)
+    argv = ["embeddings.py", "papers.csv", "--model", tiny_model, "--batch-size", "2"]
+    monkeypatch.setattr(sys, "argv", argv)
+
+    write_papers(
+        "papers.csv",
+        [
+            ("a", "we propose a model"),
+            ("b", "neural machine translation"),
+            ("c", "a novel model"),
+        ],
+    )
+    embeddings.main()
+    first = torch.load("embeddings.torch")
+    assert len(encoded) == 1 and len(encoded[0]) == 3
+
+    # Rows reordered, a whitespace-only edit to a and a new abstract for b
+    write_papers(
+        "papers.csv",
+        [
+            ("c", "a novel model"),
+            ("b", "we propose neural translation"),
+            ("a", "we  propose a\nmodel "),
+        ],
+    )
+    embeddings.main()
+    second = torch.load("embeddings.torch")
+
+    assert encoded[1] == ["we propose neural translation"]
+    assert torch.equal(second[0], first[2])
+    assert torch.equal(second[2], first[0])
+    assert not torch.allclose(second[1], first[1])
@@ -0,0 +1,144 @@
+import csv
+import json
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+from acl2020_tools.utils import import_papers, paper_import, spreadsheet_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_caches(tmp_path, monkeypatch):
+    monkeypatch.setattr(spreadsheet_cache, "CACHE_DIR", str(tmp_path / "sheets"))
+    for cache in paper_import.cleaning_caches.values():
+        monkeypatch.setattr(cache, "entries", cache.entries.__class__())
+        monkeypatch.setattr(cache, "hits", 0)
+        monkeypatch.setattr(cache, "misses", 0)
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    """ Two SRW papers and two demo papers, the second demo listed twice """
+    srw = pd.DataFrame(
+        {
+            "UID": ["srw.12", "srw.3"],
+            "title": ["An {SRW} Paper", "Another \\& One"],
+            "authors": ["Ann A| Bob B", "Cy C"],
+            "abstract": ["We  study\nparsing.", "We study $x$."],
+            "track": ["Student Research Workshop"] * 2,
+            "paper_type": ["Long"] * 2,
+        }
+    )
+    srw.to_csv(tmp_path / "srw_papers.csv", index=False)
+    pd.DataFrame(
+        {"SubID": [3, 12], "Anthology link": ["https://srw/3", "https://srw/12"]}
+    ).to_excel(tmp_path / "srw-ids.xlsx", index=False)
+    pd.DataFrame(
+        {
+            "UID": [7, 9, 9],
+            "title": ["A Demo", "{BERT} Demo", "{BERT} Demo"],
+            "authors": ["Dee D and Eve E", "Fay F", "Fay F"],
+            "abstract": ["A \\textbf{demo}.", "Try it.", "Try it."],
+            "track": ["System Demonstrations"] * 3,
+            "paper_type": ["Demo"] * 3,
+            "URL": ["https://demo/7", "https://demo/9", "https://demo/9"],
+        }
+    ).to_excel(tmp_path / "DemoPapers_SHARED.xlsx", index=False)
+    pd.DataFrame({"SubID": [7, 9], "PDF": ["https://pdf/7", "https://pdf/9"]}).to_excel(
+        tmp_path / "demo-ids.xlsx", index=False
+    )
+    (tmp_path / "sitedata").mkdir()
+    return tmp_path
+
+
+def run(monkeypatch, inputs, *extra):
+    argv = [
+        "import_papers.py",
+        "--srw-papers-file",
+        str(inputs / "srw_papers.csv"),
+        "--srw-ids-file",
+        str(inputs / "srw-ids.xlsx"),
+        "--demo-papers-file",
+        str(inputs / "DemoPapers_SHARED.xlsx"),
+        "--demo-ids-file",
+        str(inputs / "demo-ids.xlsx"),
+        "--output-dir",
+        str(inputs / "sitedata"),
+        "--workers",
+        "2",
+    ]
+    monkeypatch.setattr(sys, "argv", argv + list(extra))
+    import_papers.main()
+
+
+def read_rows(path):
+    with open(path) as f:
+        return list(csv.DictReader(f))
+
+
+def test_imports_srw_and_demo_papers_in_merge_order(monkeypatch, inputs, capsys):
+    run(monkeypatch, inputs)
+
+    for skipped in ["main_papers.csv", "cl_papers.csv", "tacl_papers.csv"]:
+        assert not os.path.exists(inputs / "sitedata" / skipped)
+    srw = read_rows(inputs / "sitedata" / "srw_papers.csv")
+    assert [row["UID"] for row in srw] == ["srw.12", "srw.3"]
+    demo = read_rows(inputs / "sitedata" / "demo_papers.csv")
+    assert [row["UID"] for row in demo] == ["demo.7", "demo.9"]
+    assert demo[0]["authors"] == "Dee D|Eve E"
+    assert demo[1]["pdf_url"] == "https://pdf/9"
+
+    papers = read_rows(inputs / "sitedata" / "papers.csv")
+    assert [row["UID"] for row in papers] == ["srw.12", "srw.3", "demo.7", "demo.9"]
+    assert [row["title"] for row in papers] == [
+        "An SRW Paper",
+        "Another & One",
+        "A Demo",
+        "BERT Demo",
+    ]
+    assert papers[0]["abstract"] == "We study parsing."
+    assert papers[1]["pdf_url"] == "https://srw/3"
+    assert "Wrote 2 papers" in capsys.readouterr().out
+
+
+def test_venues_without_inputs_are_skipped(monkeypatch, inputs):
+    argv = [
+        "import_papers.py",
+        "--srw-papers-file",
+        str(inputs / "srw_papers.csv"),
+        "--srw-ids-file",
+        str(inputs / "srw-ids.xlsx"),
+        # The demo venue is skipped: it needs both of its files
+        "--demo-papers-file",
+        str(inputs / "DemoPapers_SHARED.xlsx"),
+        "--output-dir",
+        str(inputs / "sitedata"),
+        "--workers",
+        "1",
+    ]
+    monkeypatch.setattr(sys, "argv", argv)
+    import_papers.main()
+
+    assert not os.path.exists(inputs / "sitedata" / "demo_papers.csv")
+    papers = read_rows(inputs / "sitedata" / "papers.csv")
+    assert [row["UID"] for row in papers] == ["srw.12", "srw.3"]
+
+
+def test_clean_cache_is_reused_by_the_next_run(monkeypatch, inputs):
+    clean_cache = str(inputs / "clean_cache.json")
+    run(monkeypatch, inputs, "--clean-cache", clean_cache)
+    with open(clean_cache) as f:
+        saved = json.load(f)
+    assert saved["caches"]["clean_title"]["{BERT} Demo"] == "BERT Demo"
+    first = read_rows(inputs / "sitedata" / "papers.csv")
+
+    for cache in paper_import.cleaning_caches.values():
+        cache.entries.clear()
+        cache.hits = cache.misses = 0
+    run(monkeypatch, inputs, "--clean-cache", clean_cache)
+
+    assert paper_import.clean_title.misses == 0
+    assert paper_import.clean_abstract.misses == 0
+    assert read_rows(inputs / "sitedata" / "papers.csv") == first
@@ -0,0 +1,57 @@
+import csv
+
+import pytest
+
+from acl2020_tools.utils.merge_paper_csvs import common_keys, merge_paper_csvs
+
+
+def write_csv(path, rows):
+    with open(path, "w") as fd:
+        writer = csv.DictWriter(fd, list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+
+def paper(uid, **extra):
+    return dict(UID=uid, title="T", authors="A", abstract="B", **extra)
+
+
+def test_merge_keeps_order_and_common_keys(tmp_path):
+    first = write_csv(tmp_path / "a.csv", [paper("1", track="X", session="s")])
+    second = write_csv(tmp_path / "b.csv", [paper("2"), paper("3")])
+    merge_paper_csvs(str(tmp_path / "out.csv"), [first, second])
+    with open(tmp_path / "out.csv") as fd:
+        reader = csv.DictReader(fd)
+        rows = list(reader)
+    assert reader.fieldnames == common_keys
+    assert [row["UID"] for row in rows] == ["1", "2", "3"]
+    assert [row["track"] for row in rows] == ["X", "", ""]
+
+
+def test_merge_rejects_duplicate_uids(tmp_path):
+    first = write_csv(tmp_path / "a.csv", [paper("1")])
+    second = write_csv(tmp_path / "b.csv", [paper("2"), paper("1")])
+    with pytest.raises(ValueError, match="duplicate UID 1"):
+        merge_paper_csvs(str(tmp_path / "out.csv"), [first, second])
+
+
+def test_merge_rejects_missing_required_columns(tmp_path):
+    bad = write_csv(tmp_path / "a.csv", [dict(UID="1", title="T")])
+    with pytest.raises(ValueError, match="authors"):
+        merge_paper_csvs(str(tmp_path / "out.csv"), [bad])
+
+
+def test_failed_merge_keeps_the_previous_output(tmp_path):
+    out = str(tmp_path / "out.csv")
+    merge_paper_csvs(out, [write_csv(tmp_path / "a.csv", [paper("1")])])
+    with open(out) as fd:
+        previous = fd.read()
+
+    second = write_csv(tmp_path / "b.csv", [paper("2"), paper("2")])
+    with pytest.raises(ValueError, match="duplicate UID 2"):
+        merge_paper_csvs(out, [second])
+
+    with open(out) as fd:
+        assert fd.read() == previous
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.csv", "b.csv", "out.csv"]
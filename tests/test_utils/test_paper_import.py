@@ -0,0 +1,149 @@
+import argparse
+import json
+import random
+
+import pandas as pd
+import pytest
+
+from acl2020_tools.utils import paper_import
+from acl2020_tools.utils.paper_import import (
+    CleaningCache,
+    add_clean_cache_argument,
+    clean_abstract,
+    clean_abstracts,
+    clean_title,
+    cleaning_cache,
+    direct_replacements,
+)
+
+FRAGMENTS = [
+    "\\%",
+    "\\&",
+    "$\\sim$",
+    "\\alpha",
+    "\\beta",
+    "\\Leftrightarrow",
+    "\\Rightarrow",
+    "\\Leftarrow",
+    "\\textsuperscript{12}",
+    "\\textsubscript{3}",
+    "\\textsc{BERT}",
+    "{\\sc ELMo}",
+    "\\textrm{rm text}",
+    "\\textbf{bold}",
+    "{\\bf Bold, face}",
+    "~\\citep{devlin2019}",
+    "\\cite{vaswani}",
+    "\\url{https://github.com/acl-org}",
+    "\\footnote{See the appendix.}",
+    "$O(n^2)$",
+    "$\\alpha$",
+    "$x",
+    "{\\em emphasis}",
+    "{\\it italic}",
+    "\\emph{stressed}",
+    "\\textit{slanted}",
+    "\\emph{\\textbf{nested}}",
+    "$\\textbf{math}$",
+    "{Curly}",
+    "\n",
+    "  \n  ",
+    "\t",
+]
+WORDS = "we propose a novel model for neural machine translation and parsing".split()
+
+
+def reference_clean_abstract(abstract):
+    """ clean_abstract as it was before the single-pass rewrite """
+    for source, dest in direct_replacements.items():
+        abstract = abstract.replace(source, dest)
+    abstract = paper_import.re_newline.sub(" ", abstract)
+    abstract = paper_import.re_superscript.sub(
+        paper_import.convert_superscript_match, abstract
+    )
+    abstract = paper_import.re_subscript.sub(
+        paper_import.convert_subscript_match, abstract
+    )
+    abstract = paper_import.re_textsc.sub(r"\1", abstract)
+    abstract = paper_import.re_inline_sc.sub(r"\1", abstract)
+    abstract = paper_import.re_textrm.sub(r"\1", abstract)
+    abstract = paper_import.re_textbf.sub(r"\1", abstract)
+    abstract = paper_import.re_inline_bf.sub(r"\1", abstract)
+    abstract = paper_import.re_cite.sub(" ", abstract)
+    abstract = paper_import.re_url.sub(r"\1", abstract)
+    abstract = paper_import.re_footnote.sub(r" (\1)", abstract)
+    abstract = paper_import.re_mathmode.sub(r"\1", abstract)
+    abstract = paper_import.re_inline_italics.sub(r"\1", abstract)
+    abstract = paper_import.re_italics.sub(r"\1", abstract)
+    abstract = paper_import.re_multi_space.sub(" ", abstract)
+    return abstract
+
+
+def reference_clean_title(paper_title):
+    for source, dest in direct_replacements.items():
+        paper_title = paper_title.replace(source, dest)
+    return paper_import.re_curly_brace.sub(r"\1", paper_title)
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    """ 10k synthetic abstracts; about a third of them contain no LaTeX """
+    rng = random.Random(2020)
+    abstracts = []
+    for _ in range(10000):
+        tokens = [rng.choice(WORDS) for _ in range(rng.randint(20, 200))]
+        if rng.random() > 0.3:
+            for _ in range(rng.randint(1, 8)):
+                tokens.insert(rng.randrange(len(tokens) + 1), rng.choice(FRAGMENTS))
+        abstracts.append(" ".join(tokens))
+    return abstracts
+
+
+def test_clean_abstract_matches_reference(corpus):
+    for abstract in corpus:
+        assert clean_abstract.func(abstract) == reference_clean_abstract(abstract)
+
+
+def test_clean_abstracts_matches_reference(corpus):
+    expected = [reference_clean_abstract(abstract) for abstract in corpus]
+    assert clean_abstracts(pd.Series(corpus + corpus[:100])).tolist() == (
+        expected + expected[:100]
+    )
+
+
+def test_cleaning_cache_counts_and_evicts():
+    cache = CleaningCache(str.upper, maxsize=2)
+    assert [cache("a"), cache("b"), cache("a"), cache("c")] == ["A", "B", "A", "C"]
+    assert (cache.hits, cache.misses) == (1, 3)
+    assert "a" in cache and "b" not in cache
+
+
+def test_cleaning_cache_block_saves_and_reports(tmp_path, capsys):
+    parser = argparse.ArgumentParser()
+    add_clean_cache_argument(parser)
+    path = str(tmp_path / "clean_cache.json")
+    args = parser.parse_args(["--clean-cache", path])
+
+    with cleaning_cache(args.clean_cache):
+        title = clean_title("A {BERT} title")
+
+    with open(path) as f:
+        saved = json.load(f)
+    assert saved["version"] == paper_import.cleaning_code_version()
+    assert saved["caches"]["clean_title"]["A {BERT} title"] == title
+    assert "clean_title:" in capsys.readouterr().out
+
+
+def test_clean_title_matches_reference():
+    for fragment in FRAGMENTS:
+        title = "A {Title} with " + fragment
+        assert clean_title.func(title) == reference_clean_title(title)
+
+
+def test_benchmark_reference_clean_abstract(benchmark, corpus):
+    benchmark(lambda: [reference_clean_abstract(abstract) for abstract in corpus])
+
+
+def test_benchmark_clean_abstract(benchmark, corpus):
+    benchmark(lambda: [clean_abstract.func(abstract) for abstract in corpus])
+
@@ -0,0 +1,71 @@
+import os
+
+import pandas as pd
+import pytest
+
+from acl2020_tools.utils import spreadsheet_cache
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache")
+    monkeypatch.setattr(spreadsheet_cache, "CACHE_DIR", path)
+    return path
+
+
+def cached_files(cache_dir):
+    return sorted(os.path.splitext(name)[1] for name in os.listdir(cache_dir))
+
+
+def write_sheet(path, df):
+    df.to_excel(path, index=False)
+    return str(path)
+
+
+def no_excel(*args, **kwargs):
+    raise AssertionError("the sheet should come from the cache")
+
+
+def test_plain_sheet_is_cached_as_feather(tmp_path, cache_dir, monkeypatch):
+    df = pd.DataFrame({"UID": ["main.1", "main.2"], "Session": [1, 2]})
+    path = write_sheet(tmp_path / "papers.xlsx", df)
+
+    pd.testing.assert_frame_equal(spreadsheet_cache.read_excel(path), df)
+    assert cached_files(cache_dir) == [".feather"]
+
+    monkeypatch.setattr(pd, "read_excel", no_excel)
+    pd.testing.assert_frame_equal(spreadsheet_cache.read_excel(path), df)
+
+
+def test_mixed_type_sheet_falls_back_to_pickle(tmp_path, cache_dir, monkeypatch):
+    df = pd.DataFrame({"Paper ID": [1, "demo.2"], "Track": ["NLP", "ML"]})
+    path = write_sheet(tmp_path / "ids.xlsx", df)
+
+    first = spreadsheet_cache.read_excel(path)
+    assert cached_files(cache_dir) == [".pkl"]
+
+    monkeypatch.setattr(pd, "read_excel", no_excel)
+    pd.testing.assert_frame_equal(spreadsheet_cache.read_excel(path), first)
+
+
+def test_read_options_are_part_of_the_key(tmp_path, cache_dir):
+    df = pd.DataFrame({"UID": ["main.1", "main.2"]})
+    path = write_sheet(tmp_path / "papers.xlsx", df)
+
+    spreadsheet_cache.read_excel(path)
+    assert len(spreadsheet_cache.read_excel(path, skiprows=1)) == 1
+    assert len(os.listdir(cache_dir)) == 2
+
+
+def test_edited_file_misses_the_cache(tmp_path, cache_dir):
+    path = write_sheet(tmp_path / "papers.xlsx", pd.DataFrame({"UID": ["main.1"]}))
+    spreadsheet_cache.read_excel(path)
+
+    edited = pd.DataFrame({"UID": ["main.1", "main.2"]})
+    write_sheet(path, edited)
+    stat = os.stat(path)
+    # Another mtime, in case the rewrite kept the same size and timestamp
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    pd.testing.assert_frame_equal(spreadsheet_cache.read_excel(path), edited)
+    assert len(os.listdir(cache_dir)) == 2